@@ -0,0 +1,270 @@
+"""
+Baseline profile store: hour-of-week percentiles of "normal" behavior per
+service and region, maintained incrementally with DDSketch (see sketches.py).
+
+For every (service, region, hour_of_week) the store keeps one mergeable sketch
+per metric:
+  - cpu_pct, estimated_co2_grams, requests_per_min   (each carbon-metrics point)
+  - error_rate, latency_ms                           (per 5-minute log bucket)
+
+Each run reads only data newer than the stored checkpoint, merges it into the
+touched profiles and rewrites their precomputed percentiles, so scoring a new
+point against its baseline is a single lookup (see baselines.py in the backend).
+
+Usage (example):
+  python scripts/baseline_profiles.py --since now-28d --rebuild   # full backfill
+  python scripts/baseline_profiles.py --since now-2h    # merge from a given time (data not yet merged)
+  python scripts/baseline_profiles.py                   # incremental, from checkpoint
+  python scripts/baseline_profiles.py --every 600       # keep updating
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Allow importing sibling scripts when running from repo root (python scripts/baseline_profiles.py)
+_scripts_dir = os.path.dirname(os.path.abspath(__file__))
+if _scripts_dir not in sys.path:
+    sys.path.insert(0, _scripts_dir)
+from seed_demo_data import get_es_client, index_name
+from sketches import DDSketch
+
+
+BASELINE_METRICS = ("cpu_pct", "estimated_co2_grams", "requests_per_min", "error_rate", "latency_ms")
+BASELINE_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+CHECKPOINT_ID = "_checkpoint"
+# Skip the newest few minutes so late-arriving docs land in the next run.
+INGEST_LAG = timedelta(minutes=5)
+BUCKET_MINUTES = 5
+# ES|QL row cap per query; log windows whose results hit it are split in half and re-queried.
+ROW_LIMIT = 10000
+
+LOG_BUCKETS_QUERY = """
+FROM {logs}
+| WHERE @timestamp >= TO_DATETIME(?) AND @timestamp < TO_DATETIME(?)
+| EVAL is_error = CASE(level == "ERROR", 1, 0)
+| STATS requests = COUNT(*), errors = SUM(is_error), latency_ms = AVG(latency_ms)
+  BY service, region, bucket_ts = BUCKET(@timestamp, {bucket} minutes)
+| LIMIT {limit}
+"""
+
+BASELINE_INDEX_MAPPINGS = {
+    "properties": {
+        "kind": {"type": "keyword"},
+        "service": {"type": "keyword"},
+        "region": {"type": "keyword"},
+        "hour_of_week": {"type": "integer"},
+        "percentiles": {"type": "object"},
+        "sketches": {"type": "object", "enabled": False},
+        "checkpoint": {"type": "date"},
+        "updated_at": {"type": "date"},
+    }
+}
+
+
+def hour_of_week(ts: datetime) -> int:
+    """0 = Monday 00:00 UTC ... 167 = Sunday 23:00 UTC; naive timestamps are taken as UTC."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    ts = ts.astimezone(timezone.utc)
+    return ts.weekday() * 24 + ts.hour
+
+
+def profile_id(service: str, region: str, how: int) -> str:
+    return f"{service}|{region}|{how}"
+
+
+def _parse_ts(value: str) -> datetime:
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    # Without an offset, astimezone() would read it as local time.
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+def summarize(sketches: dict) -> dict:
+    """Precomputed percentiles (+ count/mean) per metric for O(1) scoring."""
+    out = {}
+    for metric, sketch in sketches.items():
+        stats = sketch.quantiles(BASELINE_QUANTILES)
+        stats["count"] = sketch.count
+        stats["mean"] = sketch.mean
+        out[metric] = stats
+    return out
+
+
+class ProfileAccumulator:
+    """New points for this run, grouped by profile; merged into stored sketches at flush."""
+
+    def __init__(self):
+        self.points: dict[str, dict] = {}
+
+    def add(self, service: str, region: str, ts: datetime, metric: str, value) -> None:
+        if value is None or not service or not region:
+            return
+        how = hour_of_week(ts)
+        entry = self.points.setdefault(
+            profile_id(service, region, how),
+            {"service": service, "region": region, "hour_of_week": how, "sketches": {}},
+        )
+        entry["sketches"].setdefault(metric, DDSketch()).add(float(value))
+
+
+def read_checkpoint(es, target: str) -> datetime | None:
+    try:
+        doc = es.get(index=target, id=CHECKPOINT_ID)
+    except Exception:
+        return None
+    return _parse_ts(doc["_source"]["checkpoint"])
+
+
+def collect(es, acc: ProfileAccumulator, since: datetime, until: datetime) -> int:
+    # The backend imports this module for hour_of_week/profile_id; only the job needs the ES helpers.
+    from elasticsearch import helpers
+
+    points = 0
+    query = {"range": {"@timestamp": {"gte": since.isoformat(), "lt": until.isoformat()}}}
+    for hit in helpers.scan(
+        es,
+        index=index_name("spiketrace", "carbon-metrics-*"),
+        query={"query": query, "_source": ["@timestamp", "service", "region", *BASELINE_METRICS[:3]]},
+        size=5000,
+    ):
+        src = hit["_source"]
+        ts = _parse_ts(src["@timestamp"])
+        for metric in BASELINE_METRICS[:3]:
+            acc.add(src.get("service"), src.get("region"), ts, metric, src.get(metric))
+        points += 1
+
+    # ES|QL caps result rows, so walk the log window one day at a time.
+    window_start = since
+    while window_start < until:
+        window_end = min(window_start + timedelta(days=1), until)
+        for row in _log_rows(es, window_start, window_end):
+            ts = _parse_ts(row["bucket_ts"])
+            requests = row.get("requests") or 0
+            if requests:
+                acc.add(row["service"], row["region"], ts, "error_rate", (row.get("errors") or 0) / requests)
+            acc.add(row["service"], row["region"], ts, "latency_ms", row.get("latency_ms"))
+            points += 1
+        window_start = window_end
+    return points
+
+
+def _log_rows(es, start: datetime, end: datetime) -> list[dict]:
+    """5-minute log bucket rows for [start, end); halves the window while results hit ROW_LIMIT."""
+    resp = es.esql.query(
+        query=LOG_BUCKETS_QUERY.format(logs=index_name("spiketrace", "logs-*"), bucket=BUCKET_MINUTES, limit=ROW_LIMIT),
+        params=[start.isoformat(), end.isoformat()],
+    )
+    if len(resp["values"]) >= ROW_LIMIT:
+        buckets = (end - start) // timedelta(minutes=BUCKET_MINUTES)
+        if buckets < 2:
+            raise RuntimeError(f"More than {ROW_LIMIT} rows in one {BUCKET_MINUTES}-minute bucket at {start}")
+        # Split on a bucket boundary so no bucket is counted in both halves.
+        mid = start + timedelta(minutes=BUCKET_MINUTES) * (buckets // 2)
+        return _log_rows(es, start, mid) + _log_rows(es, mid, end)
+    names = [c["name"] for c in resp["columns"]]
+    return [dict(zip(names, values)) for values in resp["values"]]
+
+
+def flush(es, target: str, acc: ProfileAccumulator, checkpoint: datetime, rebuild: bool = False) -> int:
+    from elasticsearch import helpers
+
+    if not acc.points:
+        return 0
+    ids = list(acc.points)
+    existing = {}
+    # A rebuild replaces touched profiles instead of merging, so re-reading a window never double counts.
+    if not rebuild:
+        for start in range(0, len(ids), 500):
+            resp = es.mget(index=target, ids=ids[start:start + 500])
+            for doc in resp["docs"]:
+                if doc.get("found"):
+                    existing[doc["_id"]] = doc["_source"].get("sketches") or {}
+
+    now = datetime.now(timezone.utc).isoformat()
+    actions = []
+    for pid, entry in acc.points.items():
+        sketches = {m: DDSketch.from_dict(d) for m, d in existing.get(pid, {}).items()}
+        for metric, sketch in entry["sketches"].items():
+            if metric in sketches:
+                sketches[metric].merge(sketch)
+            else:
+                sketches[metric] = sketch
+        actions.append(
+            {
+                "_index": target,
+                "_id": pid,
+                "_source": {
+                    "kind": "profile",
+                    "service": entry["service"],
+                    "region": entry["region"],
+                    "hour_of_week": entry["hour_of_week"],
+                    "percentiles": summarize(sketches),
+                    "sketches": {m: s.to_dict() for m, s in sketches.items()},
+                    "updated_at": now,
+                },
+            }
+        )
+    actions.append(
+        {"_index": target, "_id": CHECKPOINT_ID, "_source": {"kind": "checkpoint", "checkpoint": checkpoint.isoformat(), "updated_at": now}}
+    )
+    helpers.bulk(es, actions, refresh="wait_for")
+    return len(actions) - 1
+
+
+def run_once(es, target: str, since: datetime | None, rebuild: bool = False) -> tuple[int, int]:
+    """
+    Merge [since or checkpoint, now) into the stored profiles. With rebuild, the
+    touched profiles are replaced instead (a full backfill, by default 28 days).
+    """
+    until = datetime.now(timezone.utc) - INGEST_LAG
+    # End on a 5-minute boundary so no log bucket is split across two runs.
+    until = until.replace(minute=until.minute - until.minute % BUCKET_MINUTES, second=0, microsecond=0)
+    if rebuild:
+        since = since or until - timedelta(days=28)
+    since = since or read_checkpoint(es, target) or until - timedelta(days=28)
+    if since >= until:
+        return 0, 0
+    acc = ProfileAccumulator()
+    points = collect(es, acc, since, until)
+    return points, flush(es, target, acc, until, rebuild=rebuild)
+
+
+def _parse_since(value: str) -> datetime:
+    if value.startswith("now-") and value[-1] in "hd":
+        amount = float(value[4:-1])
+        delta = timedelta(hours=amount) if value[-1] == "h" else timedelta(days=amount)
+        return datetime.now(timezone.utc) - delta
+    return _parse_ts(value)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Incrementally maintain hour-of-week baseline profiles.")
+    parser.add_argument("--since", type=_parse_since, default=None,
+                        help="Read from this time (ISO or now-28d) instead of the stored checkpoint")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Replace the touched profiles instead of merging into them (full backfill; "
+                             "--since defaults to now-28d)")
+    parser.add_argument("--every", type=float, default=0.0,
+                        help="Re-run every N seconds; 0 runs once (default: 0)")
+    args = parser.parse_args(argv)
+
+    es = get_es_client()
+    target = index_name("spiketrace", "baselines")
+    if not es.indices.exists(index=target):
+        es.indices.create(index=target, mappings=BASELINE_INDEX_MAPPINGS)
+
+    since, rebuild = args.since, args.rebuild
+    while True:
+        points, profiles = run_once(es, target, since, rebuild)
+        print(f"{datetime.now(timezone.utc).isoformat()} merged {points} points into {profiles} profiles")
+        if args.every <= 0:
+            break
+        since, rebuild = None, False  # later runs merge from the checkpoint
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
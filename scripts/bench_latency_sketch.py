@@ -0,0 +1,93 @@
+"""
+Benchmark merged latency sketches against exact Elasticsearch percentiles.
+
+For each time window, runs:
+  - exact: a `percentiles` aggregation over raw logs (tdigest with
+    execution_hint=high_accuracy, the closest ES gets to exact)
+  - sketch: fetch + merge the 5-minute DDSketches from latency_rollup.py
+and prints the wall time of each plus the relative error of the sketch's
+p50/p95/p99 against the aggregation.
+
+Usage (example):
+  python scripts/bench_latency_sketch.py --windows "1 hour" "24 hours" "7 days" --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_repo_root, "strands_demo_website"))
+from es_client import get_es_client, index_name  # also puts scripts/ on sys.path
+from latency_analytics import _fetch_and_merge, sketch_window_start
+
+PERCENTS = (50.0, 95.0, 99.0)
+
+
+def exact_percentiles(es, time_window: str, service: str | None) -> dict:
+    # Same bucket-aligned start as the sketches, so both sides cover the same lines.
+    filters = [{"range": {"@timestamp": {"gte": sketch_window_start(time_window)}}}]
+    if service:
+        filters.append({"term": {"service": service}})
+    resp = es.search(
+        index=index_name("spiketrace", "logs-*"),
+        query={"bool": {"filter": filters}},
+        size=0,
+        aggs={
+            "lat": {
+                "percentiles": {
+                    "field": "latency_ms",
+                    "percents": list(PERCENTS),
+                    "tdigest": {"execution_hint": "high_accuracy"},
+                }
+            }
+        },
+        request_cache=False,
+    )
+    values = resp["aggregations"]["lat"]["values"]
+    return {f"p{int(p)}": values.get(f"{p}") or values.get(str(p)) for p in PERCENTS}
+
+
+def sketch_percentiles(time_window: str, service: str | None) -> dict:
+    merged = _fetch_and_merge(time_window, service, None, ())
+    sketch = merged.get(())
+    if sketch is None:
+        return {f"p{int(p)}": None for p in PERCENTS}
+    return sketch.quantiles([p / 100 for p in PERCENTS])
+
+
+def _timed(fn, repeat: int):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(times)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Compare sketch vs exact latency percentiles.")
+    parser.add_argument("--windows", nargs="+", default=["1 hour", "24 hours", "7 days"])
+    parser.add_argument("--service", default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    es = get_es_client()
+    print(f"{'window':>10} {'exact ms':>9} {'sketch ms':>10}  relative error (p50 / p95 / p99)")
+    for window in args.windows:
+        exact, exact_ms = _timed(lambda: exact_percentiles(es, window, args.service), args.repeat)
+        approx, sketch_ms = _timed(lambda: sketch_percentiles(window, args.service), args.repeat)
+        errors = []
+        for label in exact:
+            if exact[label] and approx.get(label) is not None:
+                errors.append(f"{100.0 * abs(approx[label] - exact[label]) / exact[label]:.2f}%")
+            else:
+                errors.append("n/a")
+        print(f"{window:>10} {exact_ms:>9.1f} {sketch_ms:>10.1f}  {' / '.join(errors)}")
+
+
+if __name__ == "__main__":
+    main()
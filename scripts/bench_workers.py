@@ -0,0 +1,171 @@
+"""
+Throughput comparison of the chat backend across worker counts.
+
+For each worker count this starts `strands_demo_website/serve.py`, waits for
+/api/health, then drives a fixed number of concurrent keep-alive clients
+for a fixed duration and reports requests/s and latency percentiles.
+
+`--scenario shared-state` exercises the paths that go through the shared
+SQLite stores instead of one static path. It rotates between:
+  - POST /api/chat over a 1/minute rate limit, so nearly every call is a
+    BEGIN IMMEDIATE counter write answered with 429 before the agent is reached
+    (the first call per minute goes to a closed local port and counts as an error)
+  - GET /api/metrics, which reads the chat outcome counters
+  - GET /api/sessions/<id> for unknown ids, a session-store read answered with 404
+Every worker count gets fresh SQLite files so runs do not share state.
+
+Usage (example):
+  python scripts/bench_workers.py --workers 1 2 4 8 --duration 15 --concurrency 64
+  python scripts/bench_workers.py --path /chat.html
+  python scripts/bench_workers.py --scenario shared-state --workers 1 4
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import itertools
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVE_PY = os.path.join(_repo_root, "strands_demo_website", "serve.py")
+
+# (method, path, body, expected status) cycled by --scenario shared-state.
+SHARED_STATE_REQUESTS = [
+    ("POST", "/api/chat", {"message": "bench"}, 429),
+    ("GET", "/api/metrics", None, 200),
+    ("GET", "/api/sessions/bench-unknown", None, 404),
+]
+
+
+async def _wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/api/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"Server at {base_url} did not become ready")
+
+
+async def _drive(base_url: str, requests: list[tuple], concurrency: int, duration: float) -> dict:
+    latencies = []
+    errors = 0
+    pids = set()
+    stop_at = time.monotonic() + duration
+
+    async def worker(client: httpx.AsyncClient, offset: int) -> None:
+        nonlocal errors
+        for method, path, body, expected in itertools.islice(itertools.cycle(requests), offset, None):
+            if time.monotonic() >= stop_at:
+                return
+            start = time.perf_counter()
+            try:
+                resp = await client.request(method, path, json=body)
+                if resp.status_code != expected:
+                    errors += 1
+                elif path == "/api/health":
+                    pids.add(resp.json().get("pid"))
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        started = time.monotonic()
+        await asyncio.gather(*(worker(client, i % len(requests)) for i in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+
+    def pct(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "errors": errors,
+        "distinct_pids": len(pids),
+    }
+
+
+def run_one(workers: int, args: argparse.Namespace) -> dict:
+    port = args.port
+    env = dict(os.environ)
+    state_dir = None
+    if args.scenario == "shared-state":
+        requests = SHARED_STATE_REQUESTS
+        state_dir = tempfile.TemporaryDirectory(prefix="spiketrace-bench-")
+        env.update(
+            {
+                "SPIKETRACE_SHARED_STATE_PATH": os.path.join(state_dir.name, "shared-state.db"),
+                "SPIKETRACE_SESSION_SQLITE_PATH": os.path.join(state_dir.name, "sessions.db"),
+                "SPIKETRACE_SESSION_LOCAL_CACHE": "0",
+                "SPIKETRACE_CHAT_RATE_LIMIT_PER_MINUTE": "1",
+                # The one chat per minute that passes the limiter must not reach a real agent.
+                "SPIKETRACE_A2A_BASE": "http://127.0.0.1:9/a2a",
+            }
+        )
+        env.setdefault("ELASTICSEARCH_API_KEY", "bench")
+    else:
+        requests = [("GET", args.path, None, 200)]
+    proc = subprocess.Popen(
+        [sys.executable, SERVE_PY, "--workers", str(workers), "--port", str(port), "--host", "127.0.0.1"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(_wait_ready(base_url))
+        asyncio.run(_drive(base_url, requests, args.concurrency, min(2.0, args.duration)))  # warm-up
+        return asyncio.run(_drive(base_url, requests, args.concurrency, args.duration))
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        if state_dir is not None:
+            state_dir.cleanup()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Compare backend throughput across worker counts.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--path", default="/api/health", help="Path to request (default: /api/health)")
+    parser.add_argument("--scenario", choices=["path", "shared-state"], default="path",
+                        help="shared-state rotates rate-limit, counter and session requests instead of --path")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per worker count")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args(argv)
+
+    target = args.path if args.scenario == "path" else "shared-state mix"
+    print(f"target={target} concurrency={args.concurrency} duration={args.duration}s cpus={os.cpu_count()}")
+    print(f"{'workers':>7} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'pids':>5}")
+    baseline = None
+    for workers in args.workers:
+        result = run_one(workers, args)
+        baseline = baseline or result["rps"]
+        speedup = result["rps"] / baseline if baseline else 0.0
+        print(
+            f"{workers:>7} {result['rps']:>10.0f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+            f"{result['errors']:>7} {result['distinct_pids'] or '-':>5}  x{speedup:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Build step for the chat frontend: optimizes images, fingerprints assets and
+pre-compresses text files into strands_demo_website/frontend_dist/.
+
+  1. PNGs are re-encoded as WebP (and AVIF when the Pillow build supports it),
+     downscaled to --max-image-width. Requires the optional `Pillow` package;
+     without it images are copied unchanged.
+  2. Images and CSS get content-hashed names (styles.3f2a9c1d.css) and every
+     reference in CSS/HTML is rewritten, so they can be served as immutable.
+     HTML pages keep their names and are revalidated via ETag.
+  3. Text assets are pre-compressed to .gz (and .br when the optional `brotli`
+     package is installed) for PrecompressedStaticFiles to serve directly.
+
+Usage:
+  python scripts/build_frontend.py [--max-image-width 800] [--webp-quality 80]
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+
+try:
+    from PIL import Image, features
+except ImportError:  # optional: images are copied as-is
+    Image = None
+
+try:
+    import brotli
+except ImportError:  # optional: only .gz variants are produced
+    brotli = None
+
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(_repo_root, "strands_demo_website", "frontend")
+DIST_DIR = os.path.join(_repo_root, "strands_demo_website", "frontend_dist")
+
+COMPRESSIBLE = (".html", ".css", ".js", ".svg", ".json", ".txt")
+# Below this size compression overhead outweighs the savings.
+MIN_COMPRESS_BYTES = 512
+
+_IMG_TAG_RE = re.compile(r"<img\b[^>]*?\bsrc=\"([^\"]+)\"[^>]*>")
+
+
+def _fingerprint(rel_path: str, data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()[:8]
+    stem, ext = os.path.splitext(rel_path)
+    return f"{stem}.{digest}{ext}"
+
+
+def _write(rel_path: str, data: bytes) -> None:
+    path = os.path.join(DIST_DIR, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _encode_image(src_path: str, fmt: str, max_width: int, quality: int) -> bytes:
+    with Image.open(src_path) as img:
+        if img.width > max_width:
+            img = img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+        buf = io.BytesIO()
+        options = {"method": 6} if fmt == "WEBP" else {}
+        img.save(buf, format=fmt, quality=quality, **options)
+        return buf.getvalue()
+
+
+def build_images(args, manifest: dict) -> dict:
+    """Returns {original rel path: avif rel path} for <picture> wrapping."""
+    avif = {}
+    has_avif = Image is not None and features.check("avif")
+    images_dir = os.path.join(SRC_DIR, "images")
+    for name in sorted(os.listdir(images_dir)):
+        rel = f"images/{name}"
+        src = os.path.join(images_dir, name)
+        if name.startswith(".") or not os.path.isfile(src):
+            continue
+        if Image is not None and name.lower().endswith(".png"):
+            data = _encode_image(src, "WEBP", args.max_image_width, args.webp_quality)
+            out = _fingerprint(os.path.splitext(rel)[0] + ".webp", data)
+            if has_avif:
+                avif_data = _encode_image(src, "AVIF", args.max_image_width, args.webp_quality)
+                avif[rel] = _fingerprint(os.path.splitext(rel)[0] + ".avif", avif_data)
+                _write(avif[rel], avif_data)
+        else:
+            with open(src, "rb") as f:
+                data = f.read()
+            out = _fingerprint(rel, data)
+        _write(out, data)
+        manifest[rel] = out
+    return avif
+
+
+# Whole attribute / url() values, so "images/logo.png" never matches inside "images/logo.png.bak".
+_ATTR_REF_RE = re.compile(r"""\b(src|href|srcset)=(["'])(.*?)\2""", re.IGNORECASE)
+_CSS_URL_RE = re.compile(r"""url\((['"]?)([^'")]+)\1\)""")
+
+
+def _map_ref(ref: str, manifest: dict, prefix: str) -> str:
+    """Rewrite one reference if its path (minus ?query/#fragment) is exactly prefix + a manifest key."""
+    path, sep, rest = ref.partition("?") if "?" in ref else ref.partition("#")
+    for lead in (prefix,) if prefix else ("", "./"):
+        if path.startswith(lead) and path[len(lead):] in manifest:
+            return lead + manifest[path[len(lead):]] + sep + rest
+    return ref
+
+
+def _rewrite_refs(text: str, manifest: dict, prefix: str = "") -> str:
+    def attr(match):
+        name, quote, value = match.groups()
+        if name.lower() == "srcset":
+            # "a.png 1x, b.png 2x": rewrite the URL of each candidate.
+            value = ", ".join(
+                " ".join([_map_ref(parts[0], manifest, prefix)] + parts[1:])
+                for parts in (c.split() for c in value.split(","))
+                if parts
+            )
+        else:
+            value = _map_ref(value, manifest, prefix)
+        return f"{name}={quote}{value}{quote}"
+
+    def css_url(match):
+        quote, value = match.groups()
+        return f"url({quote}{_map_ref(value.strip(), manifest, prefix)}{quote})"
+
+    return _CSS_URL_RE.sub(css_url, _ATTR_REF_RE.sub(attr, text))
+
+
+def build_css(manifest: dict) -> None:
+    css_dir = os.path.join(SRC_DIR, "css")
+    for name in sorted(os.listdir(css_dir)):
+        if not name.endswith(".css"):
+            continue
+        rel = f"css/{name}"
+        with open(os.path.join(css_dir, name), encoding="utf-8") as f:
+            # CSS lives in css/, so images are referenced as ../images/...
+            text = _rewrite_refs(f.read(), {k: v for k, v in manifest.items() if k.startswith("images/")}, "../")
+        data = text.encode("utf-8")
+        out = _fingerprint(rel, data)
+        _write(out, data)
+        manifest[rel] = out
+
+
+def _wrap_picture(html: str, avif: dict, manifest: dict) -> str:
+    by_hashed = {manifest[k]: v for k, v in avif.items()}
+
+    def repl(match):
+        avif_rel = by_hashed.get(match.group(1))
+        if avif_rel is None:
+            return match.group(0)
+        return f'<picture><source srcset="{avif_rel}" type="image/avif">{match.group(0)}</picture>'
+
+    return _IMG_TAG_RE.sub(repl, html)
+
+
+def build_html(manifest: dict, avif: dict) -> None:
+    for name in sorted(os.listdir(SRC_DIR)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(SRC_DIR, name), encoding="utf-8") as f:
+            html = _rewrite_refs(f.read(), manifest)
+        if avif:
+            html = _wrap_picture(html, avif, manifest)
+        _write(name, html.encode("utf-8"))
+
+
+def precompress() -> int:
+    count = 0
+    for root, _, files in os.walk(DIST_DIR):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < MIN_COMPRESS_BYTES:
+                continue
+            with open(path + ".gz", "wb") as f:
+                # mtime=0 keeps the output byte-for-byte reproducible.
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(path + ".br", "wb") as f:
+                    f.write(brotli.compress(data, quality=11))
+            count += 1
+    return count
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Build the fingerprinted, compressed frontend bundle.")
+    parser.add_argument("--max-image-width", type=int, default=800)
+    parser.add_argument("--webp-quality", type=int, default=80)
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+
+    manifest: dict = {}
+    avif = build_images(args, manifest)
+    build_css(manifest)
+    build_html(manifest, avif)
+    compressed = precompress()
+
+    with open(os.path.join(DIST_DIR, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    if Image is None:
+        print("Pillow not installed: images copied without WebP/AVIF conversion.")
+    if brotli is None:
+        print("brotli not installed: only .gz variants written.")
+    print(f"Built {len(manifest)} fingerprinted assets, {compressed} pre-compressed, into {DIST_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Carbon-aware scheduling recommendations: where and when to run deferrable load.
+
+Input is each service's average CPU per (region, hour of day) from
+`spiketrace-carbon-metrics-*`. A share of that load is treated as deferrable
+(batch jobs, overprovisioned pods); the rest stays put. Every (region, hour)
+slot has a marginal cost in grams CO2 per CPU-percent-hour from the service's
+power model, the region's PUE and hourly grid intensity (carbon_utils), and a
+capacity limit of `max_util_pct`.
+
+Because the cost of a slot does not depend on where load came from, the
+transfer problem is solved exactly by a greedy two-pointer pass per service:
+take deferrable load from the dirtiest slots and place it in the cleanest slots
+with headroom, until the next move would not save anything. Slot orderings are
+sorted once per power model, so the pass is linear in the number of slots.
+
+Usage (example):
+  python scripts/carbon_scheduler.py --time-window "7 days"
+  python scripts/carbon_scheduler.py --synthetic 5000 --regions 8   # solver benchmark
+"""
+
+import argparse
+import heapq
+import json
+import os
+import random
+import sys
+import time
+
+# Allow importing sibling scripts when running from repo root (python scripts/carbon_scheduler.py)
+_scripts_dir = os.path.dirname(os.path.abspath(__file__))
+if _scripts_dir not in sys.path:
+    sys.path.insert(0, _scripts_dir)
+from carbon_utils import _grid_intensity_for_region, grid_intensity_at
+from power_models import co2_coefficients, resolve_power_model
+from seed_demo_data import get_es_client, index_name, window_to_datemath
+
+HOURS = range(24)
+DEFAULT_DEFERRABLE_SHARE = 0.3
+DEFAULT_MAX_UTIL_PCT = 80.0
+
+
+def slot_cost(service: str, region: str, hour: int) -> float:
+    """Marginal grams CO2 for one CPU-percent-point running for one hour in this slot."""
+    # cpu_coef already includes the region's average grid intensity and PUE.
+    _, cpu_coef, _ = co2_coefficients(service, None, region, 60.0)
+    return cpu_coef / 100.0 * grid_intensity_at(region, hour) / _grid_intensity_for_region(region)
+
+
+def load_profiles(es, index: str, time_window: str, service: str | None = None) -> dict[tuple, float]:
+    """Average cpu_pct per (service, region, hour_of_day) over the window, via a paged composite aggregation."""
+    filters = [{"range": {"@timestamp": {"gte": window_to_datemath(time_window)}}}]
+    if service:
+        filters.append({"term": {"service": service}})
+    profiles: dict[tuple, float] = {}
+    after = None
+    while True:
+        composite = {
+            "size": 5000,
+            "sources": [
+                {"service": {"terms": {"field": "service"}}},
+                {"region": {"terms": {"field": "region"}}},
+                {"hour": {"terms": {"field": "hour_of_day"}}},
+            ],
+        }
+        if after:
+            composite["after"] = after
+        resp = es.search(
+            index=index,
+            size=0,
+            query={"bool": {"filter": filters}},
+            runtime_mappings={"hour_of_day": {"type": "long", "script": "emit(doc['@timestamp'].value.getHour())"}},
+            aggs={"slots": {"composite": composite, "aggs": {"cpu": {"avg": {"field": "cpu_pct"}}}}},
+        )
+        agg = resp["aggregations"]["slots"]
+        for bucket in agg["buckets"]:
+            key = bucket["key"]
+            if bucket["cpu"]["value"] is not None:
+                profiles[(key["service"], key["region"], int(key["hour"]))] = bucket["cpu"]["value"]
+        after = agg.get("after_key")
+        if not agg["buckets"] or not after:
+            return profiles
+
+
+def recommend_moves(
+    profiles: dict[tuple, float],
+    deferrable_share: float = DEFAULT_DEFERRABLE_SHARE,
+    max_util_pct: float = DEFAULT_MAX_UTIL_PCT,
+    top: int = 20,
+) -> dict:
+    """
+    Greedy CO2-minimizing placement of deferrable load.
+
+    `profiles` maps (service, region, hour_of_day) -> average cpu_pct. Load only
+    moves within a service, to regions where that service already runs.
+    """
+    if not 0.0 <= deferrable_share <= 1.0:
+        raise ValueError("deferrable_share must be between 0 and 1")
+    if not 0.0 < max_util_pct <= 100.0:
+        raise ValueError("max_util_pct must be in (0, 100]")
+    if top < 0:
+        raise ValueError("top must be >= 0")
+    started = time.perf_counter()
+
+    by_service: dict[str, dict[tuple, float]] = {}
+    for (service, region, hour), cpu in profiles.items():
+        by_service.setdefault(service, {})[(region, hour)] = cpu
+    regions = sorted({region for _, region, _ in profiles})
+
+    # One cost-sorted slot list per power model, shared by every service bound to it.
+    orderings: dict[int, list[tuple[float, str, int]]] = {}
+    baseline = saved = 0.0
+    # Min-heap of the `top` largest moves as (grams, service, src_region, src_hour, dst_region, dst_hour, amount).
+    top_heap: list[tuple] = []
+    move_count = 0
+    service_savings = []
+    for service, load in by_service.items():
+        model_key = id(resolve_power_model(service))
+        ordering = orderings.get(model_key)
+        if ordering is None:
+            ordering = orderings[model_key] = sorted(
+                (slot_cost(service, region, hour), region, hour) for region in regions for hour in HOURS
+            )
+        slots = []
+        headroom = []
+        movable = []
+        for cost, region, hour in ordering:
+            cpu = load.get((region, hour))
+            if cpu is not None:
+                slots.append((cost, region, hour))
+                headroom.append(max_util_pct - cpu if cpu < max_util_pct else 0.0)
+                movable.append(deferrable_share * cpu)
+                baseline += cost * cpu
+
+        service_saved = 0.0
+        i, j = 0, len(slots) - 1
+        while i < j:
+            (dst_cost, dst_region, dst_hour), (src_cost, src_region, src_hour) = slots[i], slots[j]
+            if src_cost - dst_cost <= 1e-12:
+                break
+            amount = headroom[i] if headroom[i] < movable[j] else movable[j]
+            if amount > 0:
+                grams = amount * (src_cost - dst_cost)
+                service_saved += grams
+                move_count += 1
+                if len(top_heap) < top:
+                    heapq.heappush(top_heap, (grams, service, src_region, src_hour, dst_region, dst_hour, amount))
+                elif top and grams > top_heap[0][0]:
+                    heapq.heapreplace(top_heap, (grams, service, src_region, src_hour, dst_region, dst_hour, amount))
+                headroom[i] -= amount
+                movable[j] -= amount
+            if headroom[i] <= 1e-9:
+                i += 1
+            if movable[j] <= 1e-9:
+                j -= 1
+        saved += service_saved
+        if service_saved > 0:
+            service_savings.append((service_saved, service))
+
+    top_moves = [
+        {
+            "service": service,
+            "from_region": src_region,
+            "from_hour_utc": src_hour,
+            "to_region": dst_region,
+            "to_hour_utc": dst_hour,
+            "cpu_pct_points": round(amount, 2),
+            "co2_saved_grams_per_day": round(grams, 2),
+        }
+        for grams, service, src_region, src_hour, dst_region, dst_hour, amount in sorted(top_heap, reverse=True)
+    ]
+    top_services = [
+        {"service": service, "co2_saved_grams_per_day": round(grams, 2)}
+        for grams, service in heapq.nlargest(top, service_savings)
+    ]
+    return {
+        "services": len(by_service),
+        "slots": len(profiles),
+        "deferrable_share": deferrable_share,
+        "max_util_pct": max_util_pct,
+        "baseline_co2_grams_per_day": round(baseline, 2),
+        "co2_saved_grams_per_day": round(saved, 2),
+        "co2_saved_pct": round(100.0 * saved / baseline, 2) if baseline else 0.0,
+        "move_count": move_count,
+        "moves": top_moves,
+        "by_service": top_services,
+        "solve_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def synthetic_profiles(services: int, regions: int, seed: int = 7) -> dict[tuple, float]:
+    """Random diurnal CPU profiles for benchmarking; each service runs in 1..regions regions."""
+    rng = random.Random(seed)
+    region_names = ["us-central1", "europe-west1"] + [f"region-{n}" for n in range(max(0, regions - 2))]
+    profiles = {}
+    for s in range(services):
+        service = f"svc-{s}"
+        base = rng.uniform(10, 60)
+        for region in rng.sample(region_names[:regions], rng.randint(1, regions)):
+            peak = rng.randrange(24)
+            for hour in HOURS:
+                swing = 1.0 - min(abs(hour - peak), 24 - abs(hour - peak)) / 12.0
+                profiles[(service, region, hour)] = min(100.0, base * (0.6 + 0.8 * swing) * rng.uniform(0.9, 1.1))
+    return profiles
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Recommend where/when to move deferrable load to cut CO2.")
+    parser.add_argument("--time-window", default="7 days", help='Profile window, e.g. "7 days" (default)')
+    parser.add_argument("--service", default=None)
+    parser.add_argument("--deferrable-share", type=float, default=DEFAULT_DEFERRABLE_SHARE)
+    parser.add_argument("--max-util-pct", type=float, default=DEFAULT_MAX_UTIL_PCT)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--synthetic", type=int, default=0, help="Benchmark on N synthetic services instead of ES data")
+    parser.add_argument("--regions", type=int, default=8, help="Regions for --synthetic (default: 8)")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        profiles = synthetic_profiles(args.synthetic, args.regions)
+    else:
+        profiles = load_profiles(
+            get_es_client(), index_name("spiketrace", "carbon-metrics-*"), args.time_window, args.service
+        )
+    result = recommend_moves(profiles, args.deferrable_share, args.max_util_pct, args.top)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
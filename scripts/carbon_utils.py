@@ -8,7 +8,7 @@ It is not meant to be a precise lifecycle analysis, just a reasonable way to
 produce realistic-looking numbers that vary by region and load.
 """
 
-from typing import Dict
+from typing import Dict, List
 
 
 # Approximate grid intensity in grams CO2 per kWh, by region.
@@ -19,12 +19,46 @@ GRID_INTENSITY_G_PER_KWH: Dict[str, float] = {
 
 DEFAULT_INTENSITY_G_PER_KWH = 450.0
 
+# Power usage effectiveness (facility energy / IT energy), by region.
+PUE_BY_REGION: Dict[str, float] = {
+    "us-central1": 1.11,
+    "europe-west1": 1.09,
+}
+
+DEFAULT_PUE = 1.2
+
+# Illustrative diurnal shape of grid intensity: a multiplier on the regional
+# average per UTC hour (solar midday dip in europe-west1, overnight wind in
+# us-central1). Only used for scheduling recommendations; regions not listed are flat.
+HOURLY_INTENSITY_FACTORS: Dict[str, List[float]] = {
+    "europe-west1": [
+        1.00, 0.98, 0.97, 0.96, 0.96, 0.97, 1.00, 1.04, 1.00, 0.92, 0.84, 0.80,
+        0.78, 0.80, 0.84, 0.92, 1.02, 1.12, 1.16, 1.14, 1.10, 1.06, 1.03, 1.01,
+    ],
+    "us-central1": [
+        1.10, 1.08, 1.04, 0.98, 0.92, 0.88, 0.86, 0.86, 0.88, 0.92, 0.96, 0.98,
+        1.00, 1.02, 1.02, 1.02, 1.01, 1.00, 1.00, 1.02, 1.04, 1.07, 1.10, 1.12,
+    ],
+}
+
 
 def _grid_intensity_for_region(region: str) -> float:
     """Return grid intensity (gCO2/kWh) for a region, with a sensible default."""
     return GRID_INTENSITY_G_PER_KWH.get(region, DEFAULT_INTENSITY_G_PER_KWH)
 
 
+def grid_intensity_at(region: str, hour_utc: int) -> float:
+    """Return grid intensity (gCO2/kWh) for a region at an hour of day (UTC)."""
+    factors = HOURLY_INTENSITY_FACTORS.get(region)
+    factor = factors[hour_utc % 24] if factors else 1.0
+    return _grid_intensity_for_region(region) * factor
+
+
+def _pue_for_region(region: str) -> float:
+    """Return data-center PUE for a region, with a sensible default."""
+    return PUE_BY_REGION.get(region, DEFAULT_PUE)
+
+
 def estimate_co2_grams_formula(cpu_pct: float, region: str, window_minutes: float) -> float:
     """
     Roughly estimate grams of CO2 emitted over a time window.
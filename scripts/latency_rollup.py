@@ -0,0 +1,142 @@
+"""
+Latency sketch rollup: one mergeable DDSketch of `latency_ms` per service,
+region and 5-minute bucket, written to `<prefix>-latency-sketches`.
+
+Exact percentiles over raw `spiketrace-logs-*` get expensive as log volume
+grows; merged sketches answer p50/p95/p99 over any window within 1% relative
+error while reading at most one small doc per bucket (see latency_analytics.py
+in the backend, and bench_latency_sketch.py for the comparison).
+
+Usage (example):
+  python scripts/latency_rollup.py --since now-7d   # backfill
+  python scripts/latency_rollup.py --every 300      # incremental, from checkpoint
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from elasticsearch import helpers
+
+# Allow importing sibling scripts when running from repo root (python scripts/latency_rollup.py)
+_scripts_dir = os.path.dirname(os.path.abspath(__file__))
+if _scripts_dir not in sys.path:
+    sys.path.insert(0, _scripts_dir)
+from baseline_profiles import CHECKPOINT_ID, _parse_since, _parse_ts, read_checkpoint
+from seed_demo_data import get_es_client, index_name
+from sketches import DDSketch
+
+
+BUCKET_MINUTES = 5
+INGEST_LAG = timedelta(minutes=5)
+
+LATENCY_SKETCH_MAPPINGS = {
+    "properties": {
+        "kind": {"type": "keyword"},
+        "@timestamp": {"type": "date"},
+        "service": {"type": "keyword"},
+        "region": {"type": "keyword"},
+        "count": {"type": "double"},
+        "sum": {"type": "double"},
+        "min": {"type": "float"},
+        "max": {"type": "float"},
+        "sketch": {"type": "object", "enabled": False},
+        "checkpoint": {"type": "date"},
+    }
+}
+
+
+def bucket_start(ts: datetime) -> datetime:
+    ts = ts.astimezone(timezone.utc)
+    return ts.replace(minute=ts.minute - ts.minute % BUCKET_MINUTES, second=0, microsecond=0)
+
+
+def sketch_id(service: str, region: str, bucket: datetime) -> str:
+    return f"{service}|{region}|{bucket.isoformat()}"
+
+
+def build_sketches(hits) -> dict[tuple, DDSketch]:
+    """Group raw log hits into (service, region, bucket) -> DDSketch of latency_ms."""
+    sketches: dict[tuple, DDSketch] = {}
+    for hit in hits:
+        src = hit["_source"]
+        latency = src.get("latency_ms")
+        if latency is None or not src.get("service") or not src.get("region"):
+            continue
+        key = (src["service"], src["region"], bucket_start(_parse_ts(src["@timestamp"])))
+        sketch = sketches.get(key)
+        if sketch is None:
+            sketch = sketches[key] = DDSketch()
+        sketch.add(float(latency))
+    return sketches
+
+
+def run_once(es, target: str, since: datetime | None) -> int:
+    until = bucket_start(datetime.now(timezone.utc) - INGEST_LAG)
+    since = bucket_start(since or read_checkpoint(es, target) or until - timedelta(days=7))
+    if since >= until:
+        return 0
+
+    hits = helpers.scan(
+        es,
+        index=index_name("spiketrace", "logs-*"),
+        query={
+            "query": {"range": {"@timestamp": {"gte": since.isoformat(), "lt": until.isoformat()}}},
+            "_source": ["@timestamp", "service", "region", "latency_ms"],
+        },
+        size=5000,
+    )
+    sketches = build_sketches(hits)
+
+    actions = []
+    for (service, region, bucket), sketch in sketches.items():
+        data = sketch.to_dict()
+        actions.append(
+            {
+                "_index": target,
+                "_id": sketch_id(service, region, bucket),
+                "_source": {
+                    "kind": "sketch",
+                    "@timestamp": bucket.isoformat(),
+                    "service": service,
+                    "region": region,
+                    "count": data["count"],
+                    "sum": data["sum"],
+                    "min": data["min"],
+                    "max": data["max"],
+                    "sketch": data,
+                },
+            }
+        )
+    actions.append({"_index": target, "_id": CHECKPOINT_ID, "_source": {"kind": "checkpoint", "checkpoint": until.isoformat()}})
+    helpers.bulk(es, actions, refresh="wait_for")
+    return len(actions) - 1
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Roll raw log latency up into 5-minute DDSketches.")
+    parser.add_argument("--since", type=_parse_since, default=None,
+                        help="Recompute from this time (ISO or now-7d) instead of the stored checkpoint")
+    parser.add_argument("--every", type=float, default=0.0,
+                        help="Re-run every N seconds; 0 runs once (default: 0)")
+    args = parser.parse_args(argv)
+
+    es = get_es_client()
+    target = index_name("spiketrace", "latency-sketches")
+    if not es.indices.exists(index=target):
+        es.indices.create(index=target, mappings=LATENCY_SKETCH_MAPPINGS)
+
+    since = args.since
+    while True:
+        written = run_once(es, target, since)
+        print(f"{datetime.now(timezone.utc).isoformat()} wrote {written} latency sketches to {target}")
+        if args.every <= 0:
+            break
+        since = None
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
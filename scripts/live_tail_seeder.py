@@ -0,0 +1,445 @@
+"""
+Live-tail seeder: keeps emitting carbon metrics and logs in real time.
+
+The one-shot seeder (seed_demo_data.py) stamps data around "now - 1h" and exits,
+so dashboards go flat after a while. This daemon emits steady background traffic
+for every service/region at a configurable rate, layers spike scenarios on top
+(on a schedule and/or via an HTTP hook), and bulk-indexes through a bounded
+in-memory buffer. A background flusher thread indexes it by size or by time;
+when the cluster is unreachable, failed batches go back to the front of the
+buffer and the flusher backs off, so the buffer cap (drop-oldest) absorbs outages.
+
+Usage (example):
+  python scripts/live_tail_seeder.py --metric-interval 10 --logs-per-minute 30 \\
+      --spike-every 900 --spike-duration 300 --hook-port 8787
+
+Trigger a spike by hand:
+  curl -X POST localhost:8787/spike \\
+      -d '{"service": "checkout", "region": "us-central1", "duration_seconds": 300}'
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from elasticsearch import ApiError, TransportError, helpers
+
+# Allow importing sibling scripts when running from repo root (python scripts/live_tail_seeder.py)
+_scripts_dir = os.path.dirname(os.path.abspath(__file__))
+if _scripts_dir not in sys.path:
+    sys.path.insert(0, _scripts_dir)
+from power_models import SERVICE_INSTANCE_TYPES, estimate_co2_grams
+from seed_demo_data import create_indices, get_es_client, index_name
+
+
+SERVICES = ["checkout", "payments", "inventory"]
+REGIONS = ["us-central1", "europe-west1"]
+
+# Spike shapes mirror the one-shot seeder so live data looks like the demo data.
+SPIKE_PROFILES = {
+    ("checkout", "us-central1"): {
+        "cpu": (80, 95),
+        "mem": (70, 90),
+        "rps": (400, 700),
+        "error_type": "UpstreamTimeout",
+        "error_message": "Checkout request failed, retrying",
+        "ok_message": "Checkout request succeeded",
+        "bad_deployment": "deploy-checkout-bad",
+        "good_deployment": "deploy-checkout-good",
+    },
+    ("inventory", "europe-west1"): {
+        "cpu": (70, 88),
+        "mem": (65, 85),
+        "rps": (300, 550),
+        "error_type": "DbLockTimeout",
+        "error_message": "Inventory update failed due to DB lock timeout, retrying",
+        "ok_message": "Inventory update succeeded",
+        "bad_deployment": "deploy-inventory-bad",
+        "good_deployment": "deploy-inventory-good",
+    },
+    ("payments", "europe-west1"): {
+        "cpu": (75, 92),
+        "mem": (68, 88),
+        "rps": (350, 650),
+        "error_type": "ThirdPartyGatewayError",
+        "error_message": "Payment authorization failed due to gateway error, retrying",
+        "ok_message": "Payment authorization succeeded",
+        "bad_deployment": "deploy-payments-bad",
+        "good_deployment": "deploy-payments-good",
+    },
+}
+
+# Retry storms multiply log volume during a spike, as in the one-shot seeder.
+SPIKE_LOG_MULTIPLIER = 4
+
+
+class BoundedBuffer:
+    """
+    Thread-safe FIFO of bulk actions with a hard size cap.
+
+    When the cap is hit the oldest actions are dropped (and counted) rather than
+    growing without bound, so a slow or unavailable cluster cannot OOM the daemon.
+    """
+
+    def __init__(self, max_size: int):
+        self._items = deque(maxlen=max_size)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def extend(self, actions) -> None:
+        with self._lock:
+            for action in actions:
+                if len(self._items) == self._items.maxlen:
+                    self.dropped += 1
+                self._items.append(action)
+
+    def take(self, n: int) -> list:
+        """Remove and return up to n of the oldest actions."""
+        with self._lock:
+            return [self._items.popleft() for _ in range(min(n, len(self._items)))]
+
+    def requeue(self, actions: list) -> None:
+        """Put actions that failed to index back at the front, dropping the oldest if over the cap."""
+        with self._lock:
+            room = self._items.maxlen - len(self._items)
+            if len(actions) > room:
+                self.dropped += len(actions) - room
+                actions = actions[len(actions) - room:] if room else []
+            self._items.extendleft(reversed(actions))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+
+class SpikeController:
+    """Tracks which (service, region) pairs are currently spiking and until when."""
+
+    def __init__(self):
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def trigger(self, service: str, region: str, duration_seconds: float) -> float:
+        if (service, region) not in SPIKE_PROFILES:
+            raise ValueError(f"No spike profile for {service}/{region}")
+        until = time.monotonic() + max(duration_seconds, 0.0)
+        with self._lock:
+            self._active[(service, region)] = until
+        print(f"Spike started: {service} in {region} for {duration_seconds:.0f}s")
+        return until
+
+    def is_spiking(self, service: str, region: str) -> bool:
+        with self._lock:
+            until = self._active.get((service, region))
+            if until is None:
+                return False
+            if time.monotonic() >= until:
+                del self._active[(service, region)]
+                print(f"Spike ended: {service} in {region}")
+                return False
+            return True
+
+    def active(self) -> list:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {"service": s, "region": r, "remaining_seconds": round(until - now, 1)}
+                for (s, r), until in self._active.items()
+                if until > now
+            ]
+
+
+def generate_metric_docs(ts: datetime, window_minutes: float, spikes: SpikeController) -> list:
+    """One carbon-metrics doc per service/region for the window ending at ts."""
+    docs = []
+    for service in SERVICES:
+        for region in REGIONS:
+            profile = SPIKE_PROFILES.get((service, region))
+            spiking = spikes.is_spiking(service, region)
+            if spiking:
+                cpu = random.uniform(*profile["cpu"])
+                mem = random.uniform(*profile["mem"])
+                rps = random.uniform(*profile["rps"])
+            else:
+                cpu = random.uniform(30, 60)
+                mem = random.uniform(40, 70)
+                rps = random.uniform(200, 400)
+
+            instance_type = SERVICE_INSTANCE_TYPES.get(service)
+            co2 = estimate_co2_grams(
+                cpu, region, window_minutes, memory_pct=mem, service=service, instance_type=instance_type
+            )
+            if profile is None:
+                deployment_id = f"deploy-{service}-good"
+            else:
+                deployment_id = profile["bad_deployment" if spiking else "good_deployment"]
+
+            docs.append(
+                {
+                    "_index": index_name("spiketrace", "carbon-metrics-0001"),
+                    "_source": {
+                        "@timestamp": ts.isoformat(),
+                        "service": service,
+                        "region": region,
+                        "cloud.provider": "gcp",
+                        "cpu_pct": round(cpu, 2),
+                        "memory_pct": round(mem, 2),
+                        "requests_per_min": round(rps, 2),
+                        "estimated_co2_grams": co2,
+                        "emissions_kg_co2e": co2 / 1000.0,
+                        "deployment_id": deployment_id,
+                        "instance_type": instance_type,
+                        "window_minutes": window_minutes,
+                    },
+                }
+            )
+    return docs
+
+
+def generate_log_docs(ts: datetime, count: int, spikes: SpikeController) -> list:
+    """About `count` log lines per service/region; spiking pairs emit a retry storm instead."""
+    docs = []
+    for service in SERVICES:
+        for region in REGIONS:
+            profile = SPIKE_PROFILES.get((service, region))
+            spiking = spikes.is_spiking(service, region)
+            n = count * SPIKE_LOG_MULTIPLIER if spiking else count
+            for _ in range(n):
+                if spiking:
+                    source = {
+                        "level": "ERROR",
+                        "message": profile["error_message"],
+                        "error_type": profile["error_type"],
+                        "deployment_id": profile["bad_deployment"],
+                        "retry": True,
+                        "latency_ms": random.uniform(700, 1500),
+                    }
+                else:
+                    source = {
+                        "level": "INFO",
+                        "message": profile["ok_message"] if profile else f"{service.capitalize()} request succeeded",
+                        "error_type": None,
+                        "deployment_id": profile["good_deployment"] if profile else f"deploy-{service}-good",
+                        "retry": False,
+                        "latency_ms": random.uniform(100, 260),
+                    }
+                docs.append(
+                    {
+                        "_index": index_name("spiketrace", "logs-0001"),
+                        "_source": {
+                            "@timestamp": ts.isoformat(),
+                            "service": service,
+                            "region": region,
+                            **source,
+                        },
+                    }
+                )
+    return docs
+
+
+def _make_hook_handler(spikes: SpikeController, default_duration: float):
+    class SpikeHookHandler(BaseHTTPRequestHandler):
+        """POST /spike {service, region, duration_seconds} to start a spike; GET /spikes to list."""
+
+        def _reply(self, status: int, payload) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/spikes":
+                self._reply(200, {"active": spikes.active()})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/spike":
+                self._reply(404, {"error": "not found"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                service = payload["service"]
+                region = payload["region"]
+                duration = float(payload.get("duration_seconds", default_duration))
+                spikes.trigger(service, region, duration)
+            except (KeyError, ValueError, TypeError) as e:
+                self._reply(400, {"error": str(e)})
+                return
+            self._reply(202, {"active": spikes.active()})
+
+        def log_message(self, format, *args):
+            # Keep the daemon's stdout for seeding progress only.
+            pass
+
+    return SpikeHookHandler
+
+
+def start_hook_server(port: int, spikes: SpikeController, default_duration: float) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("0.0.0.0", port), _make_hook_handler(spikes, default_duration))
+    thread = threading.Thread(target=server.serve_forever, name="spike-hook", daemon=True)
+    thread.start()
+    print(f"Spike hook listening on :{port} (POST /spike, GET /spikes)")
+    return server
+
+
+class Flusher(threading.Thread):
+    """
+    Indexes the buffer from a background thread, so a slow or unavailable
+    cluster never stalls generation.
+
+    Flushes when `kick()` is called (buffer reached flush_size) or every
+    flush_interval seconds. On a transport error the batch is requeued and the
+    thread backs off exponentially up to max_backoff.
+    """
+
+    def __init__(self, es, buffer: BoundedBuffer, batch_size: int, interval: float, max_backoff: float = 60.0):
+        super().__init__(name="bulk-flusher", daemon=True)
+        self.es = es
+        self.buffer = buffer
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.indexed = 0
+        self.failed = 0
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def kick(self) -> None:
+        self._wake.set()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Stop the thread, then make one last attempt to index what is left."""
+        self._stopping.set()
+        self._wake.set()
+        self.join(timeout)
+        try:
+            while len(self.buffer):
+                self.flush_once()
+        except (TransportError, ApiError) as e:
+            print(f"Final flush failed ({e}); {len(self.buffer)} documents not indexed")
+
+    def flush_once(self) -> int:
+        """Index one batch; on a transport error requeue it and re-raise."""
+        actions = self.buffer.take(self.batch_size)
+        if not actions:
+            return 0
+        try:
+            # raise_on_error=False: one bad doc should not kill a long-running daemon.
+            ok, errors = helpers.bulk(self.es, actions, raise_on_error=False, stats_only=True)
+        except (TransportError, ApiError):
+            self.buffer.requeue(actions)
+            raise
+        self.indexed += ok
+        self.failed += errors
+        if errors:
+            print(f"Bulk flush: {ok} indexed, {errors} failed")
+        return ok
+
+    def run(self) -> None:
+        backoff = 0.0
+        while not self._stopping.is_set():
+            self._wake.wait(backoff or self.interval)
+            self._wake.clear()
+            if self._stopping.is_set():
+                return
+            try:
+                while len(self.buffer) and not self._stopping.is_set():
+                    self.flush_once()
+                backoff = 0.0
+            except (TransportError, ApiError) as e:
+                backoff = min(self.max_backoff, backoff * 2 if backoff else 1.0)
+                print(f"Bulk flush failed ({e}); {len(self.buffer)} buffered, retrying in {backoff:.0f}s")
+
+
+def run(args: argparse.Namespace) -> None:
+    es = get_es_client()
+    create_indices(es)
+
+    spikes = SpikeController()
+    buffer = BoundedBuffer(args.buffer_size)
+    flusher = Flusher(es, buffer, args.flush_size, args.flush_interval)
+    flusher.start()
+    hook = None
+    if args.hook_port:
+        hook = start_hook_server(args.hook_port, spikes, args.spike_duration)
+
+    scenario_cycle = itertools.cycle(SPIKE_PROFILES.keys())
+    next_spike_at = time.monotonic() + args.spike_every if args.spike_every > 0 else None
+    logs_per_tick = max(1, round(args.logs_per_minute * args.metric_interval / 60.0))
+    window_minutes = args.metric_interval / 60.0
+
+    last_report = time.monotonic()
+    next_tick = time.monotonic()
+    print(
+        f"Live tail seeding every {args.metric_interval}s "
+        f"({logs_per_tick} logs/tick per service/region); Ctrl+C to stop."
+    )
+    try:
+        while True:
+            now_mono = time.monotonic()
+            if next_spike_at is not None and now_mono >= next_spike_at:
+                service, region = next(scenario_cycle)
+                spikes.trigger(service, region, args.spike_duration)
+                next_spike_at = now_mono + args.spike_every
+
+            ts = datetime.now(timezone.utc)
+            buffer.extend(generate_metric_docs(ts, window_minutes, spikes))
+            buffer.extend(generate_log_docs(ts, logs_per_tick, spikes))
+            if len(buffer) >= args.flush_size:
+                flusher.kick()
+
+            if now_mono - last_report >= args.flush_interval:
+                last_report = now_mono
+                print(f"{ts.isoformat()} indexed={flusher.indexed} buffered={len(buffer)} dropped={buffer.dropped}")
+
+            next_tick += args.metric_interval
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+    except KeyboardInterrupt:
+        print("Stopping; flushing remaining buffer...")
+    finally:
+        flusher.stop()
+        if hook is not None:
+            hook.shutdown()
+        print(f"Done. {flusher.indexed} documents indexed, {buffer.dropped} dropped.")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Continuously seed SpikeTrace demo data in real time.")
+    parser.add_argument("--metric-interval", type=float, default=10.0,
+                        help="Seconds between metric samples per service/region (default: 10)")
+    parser.add_argument("--logs-per-minute", type=float, default=30.0,
+                        help="Baseline log lines per minute per service/region (default: 30)")
+    parser.add_argument("--flush-size", type=int, default=2000,
+                        help="Flush when this many docs are buffered (default: 2000)")
+    parser.add_argument("--flush-interval", type=float, default=5.0,
+                        help="Flush at least this often, in seconds (default: 5)")
+    parser.add_argument("--buffer-size", type=int, default=50000,
+                        help="Hard cap on buffered docs; oldest are dropped beyond it (default: 50000)")
+    parser.add_argument("--spike-every", type=float, default=0.0,
+                        help="Start the next spike scenario every N seconds; 0 disables (default: 0)")
+    parser.add_argument("--spike-duration", type=float, default=300.0,
+                        help="Spike length in seconds (default: 300)")
+    parser.add_argument("--hook-port", type=int, default=0,
+                        help="Port for the HTTP spike hook; 0 disables (default: 0)")
+    args = parser.parse_args(argv)
+    if args.metric_interval <= 0:
+        parser.error("--metric-interval must be positive")
+    if args.flush_size <= 0 or args.buffer_size < args.flush_size:
+        parser.error("--buffer-size must be >= --flush-size > 0")
+    return args
+
+
+if __name__ == "__main__":
+    run(parse_args())
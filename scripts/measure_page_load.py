@@ -0,0 +1,158 @@
+"""
+Measure page-load bytes and time for a frontend page and its local subresources.
+
+Both modes load the page and its subresources twice. The first visit starts
+with an empty cache. The repeat visit behaves like a browser cache: immutable
+assets are not requested, and everything else is revalidated with
+If-None-Match, so unchanged files come back as 304.
+
+  --offline   serve frontend/ (raw, plain StaticFiles) and frontend_dist/
+              (built, PrecompressedStaticFiles) in process through the same
+              GZipMiddleware main.py uses. Reports the measured body bytes,
+              requests and server time for each variant, plus the transfer
+              time those bytes would take at --mbps.
+  --url URL   the same two visits against a running server; the time
+              includes the real network.
+
+Usage (example):
+  python scripts/measure_page_load.py --offline --page chat.html
+  python scripts/measure_page_load.py --url http://localhost:8000 --page chat.html
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+from urllib.parse import urljoin
+
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(_repo_root, "strands_demo_website", "frontend")
+DIST_DIR = os.path.join(_repo_root, "strands_demo_website", "frontend_dist")
+APP_DIR = os.path.join(_repo_root, "strands_demo_website")
+ACCEPT_HEADERS = {"Accept-Encoding": "br, gzip"}
+
+_HTML_REF_RE = re.compile(r"""(?:src|href|srcset)=["']([^"'#?]+)["']""")
+_CSS_REF_RE = re.compile(r"""url\(['"]?([^'")#?]+)['"]?\)""")
+_ASSET_EXT = (".css", ".js", ".png", ".jpg", ".jpeg", ".webp", ".avif", ".svg", ".ico", ".woff2")
+
+
+def _local_refs(text: str, pattern: re.Pattern) -> list[str]:
+    refs = []
+    for ref in pattern.findall(text):
+        if "://" in ref or ref.startswith("//") or not ref.lower().endswith(_ASSET_EXT):
+            continue
+        refs.append(ref)
+    return refs
+
+
+def _resolve_assets(root: str, page: str) -> list[str]:
+    """Page plus its local subresources (one level of CSS url() included), relative to root."""
+    with open(os.path.join(root, page), encoding="utf-8") as f:
+        html = f.read()
+    assets = [page]
+    for ref in _local_refs(html, _HTML_REF_RE):
+        if ref not in assets:
+            assets.append(ref)
+        if ref.endswith(".css"):
+            with open(os.path.join(root, ref), encoding="utf-8") as f:
+                css = f.read()
+            for css_ref in _local_refs(css, _CSS_REF_RE):
+                resolved = os.path.normpath(os.path.join(os.path.dirname(ref), css_ref))
+                if resolved not in assets:
+                    assets.append(resolved)
+    return assets
+
+
+async def _fetch_all(client, base: str, paths: list[str], cache: dict) -> tuple[int, int]:
+    """Returns (body bytes downloaded, requests sent)."""
+    async def one(path: str):
+        entry = cache.get(path)
+        if entry and "immutable" in entry.get("cache-control", ""):
+            return 0, 0
+        headers = {"If-None-Match": entry["etag"]} if entry and entry.get("etag") else {}
+        resp = await client.get(urljoin(base, path), headers=headers)
+        await resp.aread()
+        if resp.status_code == 200:
+            cache[path] = {"etag": resp.headers.get("etag"), "cache-control": resp.headers.get("cache-control", "")}
+        return resp.num_bytes_downloaded, 1
+
+    results = await asyncio.gather(*(one(p) for p in paths))
+    return sum(r[0] for r in results), sum(r[1] for r in results)
+
+
+async def _visits(base: str, paths: list[str], transport=None) -> list[tuple[str, int, int, float]]:
+    """First and repeat visit: (label, bytes, requests, elapsed ms)."""
+    import httpx
+
+    cache: dict = {}
+    rows = []
+    for label in ("first visit", "repeat visit"):
+        async with httpx.AsyncClient(headers=ACCEPT_HEADERS, transport=transport) as client:
+            start = time.perf_counter()
+            downloaded, requests = await _fetch_all(client, base, paths, cache)
+            rows.append((label, downloaded, requests, (time.perf_counter() - start) * 1000))
+    return rows
+
+
+async def measure_offline(page: str, mbps: float) -> None:
+    import httpx
+
+    if not os.path.isdir(DIST_DIR):
+        raise SystemExit("frontend_dist/ not found; run scripts/build_frontend.py first")
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+    from starlette.middleware.gzip import GZipMiddleware
+    from starlette.staticfiles import StaticFiles
+    from static_assets import PrecompressedStaticFiles
+
+    variants = [
+        ("raw", StaticFiles(directory=SRC_DIR, html=True), _resolve_assets(SRC_DIR, page)),
+        ("built", PrecompressedStaticFiles(directory=DIST_DIR, html=True), _resolve_assets(DIST_DIR, page)),
+    ]
+    print(f"{page}: body bytes, requests and time per visit (transfer estimated at {mbps:g} Mbps)")
+    print(f"{'':>6} {'visit':>13} {'bytes':>10} {'requests':>9} {'server ms':>10} {'transfer ms':>12}")
+    first_visit = {}
+    for label, app, paths in variants:
+        # main.py wraps every response in GZipMiddleware(minimum_size=1024).
+        transport = httpx.ASGITransport(app=GZipMiddleware(app, minimum_size=1024))
+        for visit, downloaded, requests, elapsed in await _visits("http://frontend.local/", paths, transport):
+            first_visit.setdefault(label, downloaded)
+            transfer_ms = downloaded * 8 / (mbps * 1000)
+            print(f"{label:>6} {visit:>13} {downloaded:>10,} {requests:>9} {elapsed:>10.1f} {transfer_ms:>12.1f}")
+    if first_visit.get("raw"):
+        saved = 100.0 * (first_visit["raw"] - first_visit["built"]) / first_visit["raw"]
+        print(f"first-visit bytes saved: {saved:.1f}%")
+
+
+async def measure_url(base: str, page: str) -> None:
+    import httpx
+
+    base = base.rstrip("/") + "/"
+    async with httpx.AsyncClient(headers=ACCEPT_HEADERS) as client:
+        html = (await client.get(urljoin(base, page))).text
+    paths = [page] + [r for r in dict.fromkeys(_local_refs(html, _HTML_REF_RE))]
+
+    for visit, downloaded, requests, elapsed in await _visits(base, paths):
+        print(f"{visit:>13}: {downloaded:>10,} body bytes, {requests} requests, {elapsed:.1f} ms")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Measure frontend page-load bytes and time.")
+    parser.add_argument("--page", default="chat.html")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--offline", action="store_true")
+    group.add_argument("--url")
+    parser.add_argument("--mbps", type=float, default=10.0,
+                        help="Link speed for the --offline transfer-time estimate (default: 10)")
+    args = parser.parse_args(argv)
+
+    if args.offline:
+        asyncio.run(measure_offline(args.page, args.mbps))
+    else:
+        asyncio.run(measure_url(args.url, args.page))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Measure backend cold-start import time with `python -X importtime`.
+
+Runs `import <module>` in a fresh interpreter from strands_demo_website/ (so it
+sees the same sys.path as uvicorn) several times, and reports the median import
+time of that module (interpreter startup excluded) plus the top-level packages
+it pulls in that spend the most self time, summed across import depths. Also times
+the per-request config path: `load_settings()` (cached) against re-running
+`load_dotenv()` + getenv on every call, which is what each chat request used to do.
+
+Usage (example):
+  python scripts/measure_startup.py                       # import main
+  python scripts/measure_startup.py --module strands_spiketrace_agent --top 15
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import timeit
+from unittest import mock
+
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(_repo_root, "strands_demo_website")
+
+# "import time:      self [us] |  cumulative | imported package"
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_profile(module: str) -> tuple[int, dict[str, int]]:
+    """Cumulative microseconds of one cold import of `module`, and self microseconds per top-level package under it."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "unknown error"
+        raise SystemExit(f"import {module} failed: {tail}")
+    # Lines come children first, so everything since the previous depth-1 line
+    # (interpreter startup modules such as site and encodings) belongs to `module`.
+    nested: list[tuple[int, str]] = []
+    for line in proc.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative, indent, name = int(match.group(1)), int(match.group(2)), len(match.group(3)), match.group(4)
+        if indent > 1:
+            nested.append((self_us, name))
+            continue
+        if name == module:
+            packages: dict[str, int] = {}
+            for us, child in nested:
+                top = child.split(".")[0]
+                packages[top] = packages.get(top, 0) + us
+            return cumulative, packages
+        nested = []
+    raise SystemExit(f"import {module}: no -X importtime line for it")
+
+
+def config_overhead(calls: int) -> tuple[float, float]:
+    """Microseconds per call: cached settings vs load_dotenv + getenv per call."""
+    sys.path.insert(0, APP_DIR)
+    from dotenv import load_dotenv
+    from settings import load_settings
+
+    def per_request_env():
+        load_dotenv()
+        return os.getenv("SPIKETRACE_A2A_BASE"), os.getenv("ELASTICSEARCH_API_KEY"), os.getenv("SPIKETRACE_AGENT_ID")
+
+    # lru_cache does not cache exceptions, so without these every "cached" call would re-validate.
+    placeholders = {
+        "SPIKETRACE_A2A_BASE": os.getenv("SPIKETRACE_A2A_BASE") or "http://127.0.0.1:9/a2a",
+        "ELASTICSEARCH_API_KEY": os.getenv("ELASTICSEARCH_API_KEY") or "measure-startup",
+    }
+    with mock.patch.dict(os.environ, placeholders):
+        load_settings.cache_clear()
+        load_settings()
+        before = timeit.timeit(per_request_env, number=calls) / calls * 1e6
+        after = timeit.timeit(load_settings, number=calls) / calls * 1e6
+        load_settings.cache_clear()
+    return before, after
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Measure backend import time and per-request config overhead.")
+    parser.add_argument("--module", default="main", help="Module to import from strands_demo_website/ (default: main)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--calls", type=int, default=2000, help="Calls for the config overhead comparison")
+    args = parser.parse_args(argv)
+
+    totals = []
+    per_package: dict[str, list[int]] = {}
+    for _ in range(args.runs):
+        total, packages = import_profile(args.module)
+        totals.append(total)
+        for name, us in packages.items():
+            per_package.setdefault(name, []).append(us)
+
+    print(f"import {args.module}: median {statistics.median(totals) / 1000:.1f} ms over {args.runs} cold runs")
+    ranked = sorted(((statistics.median(v), k) for k, v in per_package.items()), reverse=True)
+    for us, name in ranked[: args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    before, after = config_overhead(args.calls)
+    print(f"config per request: load_dotenv+getenv {before:.1f} us, cached load_settings {after:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
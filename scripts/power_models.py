@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+"""
+Pluggable power models for fleet-level carbon accounting.
+
+`carbon_utils.estimate_co2_grams_formula` uses one hardcoded full-load wattage
+for every service. This module replaces that with a registry of linear power
+models (idle watts + CPU-proportional watts + memory watts) that can be bound
+per service, per instance type, or per (service, instance type), combined with
+per-region grid intensity and PUE from carbon_utils.
+
+Every model is linear in CPU and memory utilization, so for a fixed
+(service, instance type, region, window) the CO2 estimate collapses to three
+coefficients:
+
+    co2_grams = base + cpu_coef * cpu_utilization + mem_coef * memory_utilization
+
+Batch evaluation caches those coefficients per key, which keeps the per-row
+cost at a dict lookup and two multiplications - enough to recompute tens of
+millions of historical rows in a streaming pass. The same coefficients are
+exported for the Painless script used by reprocess_co2.py.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from carbon_utils import (
+    DEFAULT_INTENSITY_G_PER_KWH,
+    DEFAULT_PUE,
+    GRID_INTENSITY_G_PER_KWH,
+    PUE_BY_REGION,
+    _grid_intensity_for_region,
+    _pue_for_region,
+)
+
+
+@dataclass(frozen=True)
+class PowerModel:
+    """
+    Linear power model for a unit of capacity (a pod group, node pool, fleet slice).
+
+    - idle_watts: draw at 0% CPU
+    - max_watts: draw at 100% CPU (includes idle)
+    - memory_watts: additional draw at 100% memory utilization
+    """
+
+    idle_watts: float
+    max_watts: float
+    memory_watts: float = 0.0
+
+    def __post_init__(self):
+        if self.idle_watts < 0 or self.memory_watts < 0:
+            raise ValueError("PowerModel watts must be non-negative")
+        if self.max_watts < self.idle_watts:
+            raise ValueError("PowerModel max_watts must be >= idle_watts")
+
+    def watts(self, cpu_pct: float, memory_pct: float = 0.0) -> float:
+        cpu = _clamp_utilization(cpu_pct)
+        mem = _clamp_utilization(memory_pct)
+        return self.idle_watts + (self.max_watts - self.idle_watts) * cpu + self.memory_watts * mem
+
+
+# Fleet-scale defaults, sized like the original single-formula model
+# (50 kW at full load) so demo emissions stay in the same range.
+DEFAULT_POWER_MODEL = PowerModel(idle_watts=15000.0, max_watts=50000.0, memory_watts=4000.0)
+
+# Per-node models, bound to the instance type of the same name.
+NODE_POWER_MODELS: Dict[str, PowerModel] = {
+    "n2-standard-8": PowerModel(idle_watts=40.0, max_watts=180.0, memory_watts=25.0),
+    "n2-highmem-8": PowerModel(idle_watts=50.0, max_watts=200.0, memory_watts=60.0),
+    "e2-standard-4": PowerModel(idle_watts=20.0, max_watts=95.0, memory_watts=12.0),
+}
+
+# Demo fleet: the node pool each service runs on. Metric docs carry the
+# instance_type; node counts keep each pool in the same range as the old 50 kW model.
+SERVICE_INSTANCE_TYPES: Dict[str, str] = {
+    "checkout": "n2-standard-8",
+    "payments": "n2-highmem-8",
+    "inventory": "e2-standard-4",
+}
+SERVICE_NODE_COUNTS: Dict[str, int] = {"checkout": 250, "payments": 220, "inventory": 450}
+
+
+def _pool(node: PowerModel, nodes: int) -> PowerModel:
+    return PowerModel(node.idle_watts * nodes, node.max_watts * nodes, node.memory_watts * nodes)
+
+
+# Named models that services / instance types can be bound to.
+POWER_MODELS: Dict[str, PowerModel] = {
+    "fleet-default": DEFAULT_POWER_MODEL,
+    **NODE_POWER_MODELS,
+    **{
+        f"{service}-pool": _pool(NODE_POWER_MODELS[instance_type], SERVICE_NODE_COUNTS[service])
+        for service, instance_type in SERVICE_INSTANCE_TYPES.items()
+    },
+}
+
+# Bindings from services / instance types to model names. Resolution order is
+# (service, instance_type) -> instance_type -> service -> DEFAULT_POWER_MODEL.
+# Service bindings also cover rows written before instance_type was recorded.
+SERVICE_POWER_MODELS: Dict[str, str] = {service: f"{service}-pool" for service in SERVICE_INSTANCE_TYPES}
+INSTANCE_TYPE_POWER_MODELS: Dict[str, str] = {name: name for name in NODE_POWER_MODELS}
+SERVICE_INSTANCE_POWER_MODELS: Dict[Tuple[str, str], str] = {
+    (service, instance_type): f"{service}-pool" for service, instance_type in SERVICE_INSTANCE_TYPES.items()
+}
+
+_coefficient_cache: Dict[Tuple[str, str, str, float], Tuple[float, float, float]] = {}
+
+
+def _clamp_utilization(pct: Optional[float]) -> float:
+    if pct is None or pct <= 0:
+        return 0.0
+    return min(pct, 100.0) / 100.0
+
+
+def register_power_model(
+    name: str,
+    model: PowerModel,
+    *,
+    service: Optional[str] = None,
+    instance_type: Optional[str] = None,
+) -> None:
+    """
+    Register a named model, optionally binding it to a service, an instance type,
+    or a (service, instance_type) pair.
+    """
+    POWER_MODELS[name] = model
+    if service and instance_type:
+        SERVICE_INSTANCE_POWER_MODELS[(service, instance_type)] = name
+    elif instance_type:
+        INSTANCE_TYPE_POWER_MODELS[instance_type] = name
+    elif service:
+        SERVICE_POWER_MODELS[service] = name
+    _coefficient_cache.clear()
+
+
+def resolve_power_model(service: Optional[str] = None, instance_type: Optional[str] = None) -> PowerModel:
+    """Return the most specific registered model for a service / instance type."""
+    name = None
+    if service and instance_type:
+        name = SERVICE_INSTANCE_POWER_MODELS.get((service, instance_type))
+    if name is None and instance_type:
+        name = INSTANCE_TYPE_POWER_MODELS.get(instance_type)
+    if name is None and service:
+        name = SERVICE_POWER_MODELS.get(service)
+    if name is None:
+        return DEFAULT_POWER_MODEL
+    return POWER_MODELS[name]
+
+
+def co2_coefficients(
+    service: Optional[str],
+    instance_type: Optional[str],
+    region: str,
+    window_minutes: float,
+) -> Tuple[float, float, float]:
+    """
+    Return (base, cpu_coef, mem_coef) in grams such that
+    co2 = base + cpu_coef * cpu_util + mem_coef * mem_util, with utilizations in 0..1.
+    """
+    key = (service or "", instance_type or "", region, window_minutes)
+    cached = _coefficient_cache.get(key)
+    if cached is not None:
+        return cached
+
+    model = resolve_power_model(service, instance_type)
+    # watts * hours / 1000 = kWh; kWh * gCO2/kWh * PUE = grams
+    grams_per_watt = (window_minutes / 60.0) / 1000.0 * _grid_intensity_for_region(region) * _pue_for_region(region)
+    coefficients = (
+        model.idle_watts * grams_per_watt,
+        (model.max_watts - model.idle_watts) * grams_per_watt,
+        model.memory_watts * grams_per_watt,
+    )
+    _coefficient_cache[key] = coefficients
+    return coefficients
+
+
+def estimate_co2_grams(
+    cpu_pct: float,
+    region: str,
+    window_minutes: float,
+    *,
+    memory_pct: float = 0.0,
+    service: Optional[str] = None,
+    instance_type: Optional[str] = None,
+) -> float:
+    """
+    Estimate grams of CO2 for one metric window using the registered power models.
+
+    Unlike estimate_co2_grams_formula this accounts for idle draw, memory and PUE,
+    so an idle-but-provisioned service still emits.
+    """
+    if window_minutes <= 0:
+        return 0.0
+    base, cpu_coef, mem_coef = co2_coefficients(service, instance_type, region, window_minutes)
+    return base + cpu_coef * _clamp_utilization(cpu_pct) + mem_coef * _clamp_utilization(memory_pct)
+
+
+def iter_co2_grams(rows: Iterable[dict], window_minutes: float = 5.0) -> Iterator[float]:
+    """
+    Stream CO2 estimates for metric rows (dicts shaped like carbon-metrics _source).
+
+    Rows may carry their own `window_minutes`; if missing or null the argument is used.
+    Coefficients are cached per (service, instance_type, region, window), so this
+    is safe to run over tens of millions of rows without materializing them.
+    """
+    for row in rows:
+        window = row.get("window_minutes")
+        if window is None:
+            window = window_minutes
+        if window <= 0:
+            yield 0.0
+            continue
+        base, cpu_coef, mem_coef = co2_coefficients(
+            row.get("service"), row.get("instance_type"), row.get("region", ""), window
+        )
+        yield (
+            base
+            + cpu_coef * _clamp_utilization(row.get("cpu_pct"))
+            + mem_coef * _clamp_utilization(row.get("memory_pct"))
+        )
+
+
+def estimate_co2_grams_batch(rows: Iterable[dict], window_minutes: float = 5.0) -> List[float]:
+    """Evaluate a batch of metric rows; see iter_co2_grams."""
+    return list(iter_co2_grams(rows, window_minutes))
+
+
+def painless_params(window_minutes: float = 5.0) -> dict:
+    """
+    Export the registry as params for the reprocessing Painless script.
+
+    Model keys follow the resolution order: "service|instance_type",
+    "|instance_type", "service|" and "|" (default). Watts are pre-multiplied by
+    the window length so the script only applies grid intensity and PUE; rows
+    that carry their own `window_minutes` are rescaled against `window_minutes`.
+    """
+    kwh_per_watt = (window_minutes / 60.0) / 1000.0
+
+    def scaled(model: PowerModel) -> List[float]:
+        return [
+            model.idle_watts * kwh_per_watt,
+            (model.max_watts - model.idle_watts) * kwh_per_watt,
+            model.memory_watts * kwh_per_watt,
+        ]
+
+    models = {"|": scaled(DEFAULT_POWER_MODEL)}
+    for service, name in SERVICE_POWER_MODELS.items():
+        models[f"{service}|"] = scaled(POWER_MODELS[name])
+    for instance_type, name in INSTANCE_TYPE_POWER_MODELS.items():
+        models[f"|{instance_type}"] = scaled(POWER_MODELS[name])
+    for (service, instance_type), name in SERVICE_INSTANCE_POWER_MODELS.items():
+        models[f"{service}|{instance_type}"] = scaled(POWER_MODELS[name])
+
+    regions = set(GRID_INTENSITY_G_PER_KWH) | set(PUE_BY_REGION)
+    return {
+        "window_minutes": window_minutes,
+        "models": models,
+        "region_factor": {r: _grid_intensity_for_region(r) * _pue_for_region(r) for r in regions},
+        "default_region_factor": DEFAULT_INTENSITY_G_PER_KWH * DEFAULT_PUE,
+    }
@@ -0,0 +1,128 @@
+"""
+Recompute `estimated_co2_grams` / `emissions_kg_co2e` in place for historical
+carbon metrics using the power model registry (see power_models.py).
+
+The arithmetic runs inside Elasticsearch as a Painless script driven by
+update-by-query, split into parallel slices, so tens of millions of rows are
+rewritten without streaming them through Python.
+
+Usage (example):
+  python scripts/reprocess_co2.py --since 2026-01-01 --slices auto
+  python scripts/reprocess_co2.py --dry-run
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Allow importing sibling scripts when running from repo root (python scripts/reprocess_co2.py)
+_scripts_dir = os.path.dirname(os.path.abspath(__file__))
+if _scripts_dir not in sys.path:
+    sys.path.insert(0, _scripts_dir)
+from power_models import painless_params
+
+
+# Mirrors power_models.co2_coefficients: model watts are pre-scaled to kWh per
+# window, then multiplied by region grid intensity * PUE (and by the row's own
+# window length relative to params.window_minutes, when it has one).
+REPROCESS_SCRIPT = """
+String svc = ctx._source.service == null ? '' : ctx._source.service;
+String it = ctx._source.instance_type == null ? '' : ctx._source.instance_type;
+def m = params.models.get(svc + '|' + it);
+if (m == null && it != '') { m = params.models.get('|' + it); }
+if (m == null) { m = params.models.get(svc + '|'); }
+if (m == null) { m = params.models.get('|'); }
+
+def factor = params.region_factor.get(ctx._source.region);
+if (factor == null) { factor = params.default_region_factor; }
+
+double cpu = ctx._source.cpu_pct == null ? 0.0 : Math.min(Math.max(ctx._source.cpu_pct, 0.0), 100.0) / 100.0;
+double mem = ctx._source.memory_pct == null ? 0.0 : Math.min(Math.max(ctx._source.memory_pct, 0.0), 100.0) / 100.0;
+double scale = ctx._source.window_minutes == null ? 1.0 : ctx._source.window_minutes / params.window_minutes;
+double co2 = (m[0] + m[1] * cpu + m[2] * mem) * factor * scale;
+
+ctx._source.estimated_co2_grams = co2;
+ctx._source.emissions_kg_co2e = co2 / 1000.0;
+"""
+
+
+def build_query(since: str | None, until: str | None) -> dict:
+    if not since and not until:
+        return {"match_all": {}}
+    time_range = {}
+    if since:
+        time_range["gte"] = since
+    if until:
+        time_range["lt"] = until
+    return {"range": {"@timestamp": time_range}}
+
+
+def wait_for_task(es, task_id: str, poll_seconds: float) -> dict:
+    """Poll the tasks API until the update-by-query (and all its slices) finish."""
+    while True:
+        task = es.tasks.get(task_id=task_id)
+        status = task["task"].get("status", {})
+        print(
+            f"  updated={status.get('updated', 0)}/{status.get('total', '?')} "
+            f"conflicts={status.get('version_conflicts', 0)}"
+        )
+        if task.get("completed"):
+            return task
+        time.sleep(poll_seconds)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Recompute CO2 for historical carbon metrics in place.")
+    parser.add_argument("--index", default=None,
+                        help="Index pattern to rewrite (default: <prefix>-carbon-metrics-*)")
+    parser.add_argument("--since", default=None, help="Only rows with @timestamp >= this (ES date math ok)")
+    parser.add_argument("--until", default=None, help="Only rows with @timestamp < this (ES date math ok)")
+    parser.add_argument("--window-minutes", type=float, default=5.0,
+                        help="Window length for rows without a window_minutes field (default: 5)")
+    parser.add_argument("--slices", default="auto",
+                        help='Parallel update-by-query slices: "auto" or an integer (default: auto)')
+    parser.add_argument("--requests-per-second", type=float, default=-1,
+                        help="Throttle; -1 disables throttling (default: -1)")
+    parser.add_argument("--poll-seconds", type=float, default=5.0)
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Print the script params and query instead of running")
+    args = parser.parse_args(argv)
+
+    params = painless_params(args.window_minutes)
+    query = build_query(args.since, args.until)
+    slices = args.slices if args.slices == "auto" else int(args.slices)
+
+    if args.dry_run:
+        print(json.dumps({"query": query, "slices": slices, "params": params}, indent=2))
+        return
+
+    from seed_demo_data import get_es_client, index_name
+
+    es = get_es_client()
+    index = args.index or index_name("spiketrace", "carbon-metrics-*")
+    print(f"Reprocessing CO2 in {index} with slices={slices}...")
+    resp = es.update_by_query(
+        index=index,
+        query=query,
+        script={"source": REPROCESS_SCRIPT, "lang": "painless", "params": params},
+        slices=slices,
+        conflicts="proceed",
+        requests_per_second=args.requests_per_second,
+        wait_for_completion=False,
+        refresh=True,
+    )
+    task = wait_for_task(es, resp["task"], args.poll_seconds)
+    result = task.get("response", {})
+    failures = result.get("failures") or []
+    print(
+        f"Done. updated={result.get('updated', 0)} took={result.get('took', 0)}ms "
+        f"failures={len(failures)}"
+    )
+    if failures:
+        raise SystemExit(json.dumps(failures[:5], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,28 @@
+from __future__ import annotations
+
 import os
 import random
+import re
 import sys
 from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING
 
 from dotenv import load_dotenv
-from elasticsearch import Elasticsearch, helpers
+
+if TYPE_CHECKING:
+    from elasticsearch import Elasticsearch
 
 # Allow importing carbon_utils when running from repo root (python scripts/seed_demo_data.py)
 _scripts_dir = os.path.dirname(os.path.abspath(__file__))
 if _scripts_dir not in sys.path:
     sys.path.insert(0, _scripts_dir)
-from carbon_utils import estimate_co2_grams_formula
+from power_models import SERVICE_INSTANCE_TYPES, co2_coefficients, estimate_co2_grams
 
 
 def get_es_client() -> Elasticsearch:
+    # Imported here so modules that only need index_name (e.g. the backend) do not load the ES client.
+    from elasticsearch import Elasticsearch
+
     load_dotenv()
     api_key = os.getenv("ELASTICSEARCH_API_KEY")
     cloud_id = os.getenv("ELASTICSEARCH_CLOUD_ID")
@@ -35,6 +44,35 @@ def index_name(prefix: str, base: str) -> str:
     return f"{idx_prefix}-{base}"
 
 
+_WINDOW_RE = re.compile(r"^\s*(\d+)\s*(minute|hour|day|week)s?\s*$", re.IGNORECASE)
+_DATEMATH_UNITS = {"minute": "m", "hour": "h", "day": "d", "week": "w"}
+
+
+def _parse_window(time_window: str) -> tuple[int, str]:
+    match = _WINDOW_RE.match(time_window)
+    if not match:
+        raise ValueError('time_window must look like "30 minutes", "6 hours" or "7 days"')
+    return int(match.group(1)), match.group(2).lower()
+
+
+def window_to_datemath(time_window: str) -> str:
+    """ "6 hours" -> "now-6h", matching the time_window strings the agent tools use."""
+    amount, unit = _parse_window(time_window)
+    return f"now-{amount}{_DATEMATH_UNITS[unit]}"
+
+
+def window_to_timedelta(time_window: str) -> timedelta:
+    """ "6 hours" -> timedelta(hours=6); same accepted forms as window_to_datemath."""
+    amount, unit = _parse_window(time_window)
+    return timedelta(**{f"{unit}s": amount})
+
+
+def excess_cpu_co2_grams(service: str, region: str, extra_cpu_pct: float, window_minutes: float) -> float:
+    """CO2 from extra CPU alone (no idle or memory draw), using the service's power model."""
+    _, cpu_coef, _ = co2_coefficients(service, SERVICE_INSTANCE_TYPES.get(service), region, window_minutes)
+    return cpu_coef * min(max(extra_cpu_pct, 0.0), 100.0) / 100.0
+
+
 def create_indices(es: Elasticsearch) -> None:
     carbon_metrics_index = index_name("spiketrace", "carbon-metrics-0001")
     logs_index = index_name("spiketrace", "logs-0001")
@@ -56,6 +94,8 @@ def create_indices(es: Elasticsearch) -> None:
                     "estimated_co2_grams": {"type": "float"},
                     "emissions_kg_co2e": {"type": "float"},
                     "deployment_id": {"type": "keyword"},
+                    "instance_type": {"type": "keyword"},
+                    "window_minutes": {"type": "float"},
                 }
             },
         )
@@ -186,7 +226,10 @@ def generate_carbon_spike_data(base_time: datetime):
                         mem = random.uniform(68, 88)
                         rps = random.uniform(350, 650)
 
-                co2 = estimate_co2_grams_formula(cpu, region, window_minutes=5.0)
+                instance_type = SERVICE_INSTANCE_TYPES.get(service)
+                co2 = estimate_co2_grams(
+                    cpu, region, 5.0, memory_pct=mem, service=service, instance_type=instance_type
+                )
                 emissions_kg = co2 / 1000.0
 
                 if is_spike_window:
@@ -208,6 +251,8 @@ def generate_carbon_spike_data(base_time: datetime):
                             "estimated_co2_grams": co2,
                             "emissions_kg_co2e": emissions_kg,
                             "deployment_id": deployment_id,
+                            "instance_type": instance_type,
+                            "window_minutes": 5.0,
                         },
                     }
                 )
@@ -518,11 +563,7 @@ def generate_incidents():
 
     for incident in curated_incidents:
         duration = incident["duration_minutes"]
-        wasted_co2 = estimate_co2_grams_formula(
-            cpu_pct=60.0,
-            region=incident["region"],
-            window_minutes=duration,
-        )
+        wasted_co2 = excess_cpu_co2_grams(incident["service"], incident["region"], 60.0, duration)
         wasted_kg = wasted_co2 / 1000.0
         docs.append(
             {
@@ -567,11 +608,7 @@ def generate_incidents():
 
         # Approximate wasted CO2 from excess CPU during the incident window
         extra_cpu_pct = random.uniform(10.0, 60.0)
-        wasted_co2 = estimate_co2_grams_formula(
-            cpu_pct=extra_cpu_pct,
-            region=region,
-            window_minutes=duration,
-        )
+        wasted_co2 = excess_cpu_co2_grams(service, region, extra_cpu_pct, duration)
         wasted_kg = wasted_co2 / 1000.0
 
         # Rough e-commerce business impact model:
@@ -649,11 +686,7 @@ def generate_incidents():
             duration = random.uniform(20.0, 180.0)
 
             extra_cpu_pct = random.uniform(10.0, 60.0)
-            wasted_co2 = estimate_co2_grams_formula(
-                cpu_pct=extra_cpu_pct,
-                region=region,
-                window_minutes=duration,
-            )
+            wasted_co2 = excess_cpu_co2_grams(service, region, extra_cpu_pct, duration)
             wasted_kg = wasted_co2 / 1000.0
 
             severity_multiplier = {
@@ -743,6 +776,8 @@ def main():
     all_docs = carbon_docs + log_docs + deployment_docs + incident_docs
 
     print(f"Indexing {len(all_docs)} documents...")
+    from elasticsearch import helpers
+
     helpers.bulk(es, all_docs)
     print("Done. Demo data loaded.")
 
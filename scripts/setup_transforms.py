@@ -0,0 +1,343 @@
+"""
+Pre-aggregated summary indices for the dashboard, maintained by Elasticsearch
+continuous transforms, plus a variant of the dashboard export that reads them.
+
+Each panel in dashboards/spiketrace_dashboard.ndjson aggregates raw metrics or
+logs on every refresh. Each transform here pivots the raw data into one doc per
+minute, grouped the way its panel groups, so a 30-day panel reads tens of
+thousands of small docs instead of every raw point:
+
+  Panel                          Transform / summary index             Field
+  Estimated CO2 by service       <prefix>-rollup-carbon-service-1m     service_co2_grams (sum)
+  Estimated CO2 Over Time        <prefix>-rollup-carbon-1m             co2_n / co2_sum / co2_sumsq
+  Emissions Deviation By Region  <prefix>-rollup-emissions-region-1m   region_emissions_n / _sum / _sumsq
+  Latency over Time              <prefix>-rollup-latency-1m            latency_p50_ms
+
+The transforms keep count, sum and sum of squares per minute, and the rollup
+panels use a Lens formula over their sums, so standard deviations are exact at
+any interval. Percentiles do not combine that way: the latency panel takes the
+median of the per-minute p50s and is labelled approximate.
+
+Usage (example):
+  python scripts/setup_transforms.py                    # create + start transforms, write dashboard variant
+  python scripts/setup_transforms.py --dry-run          # print transform bodies only
+  python scripts/setup_transforms.py --recreate         # replace existing transforms
+  python scripts/setup_transforms.py --benchmark-days 30
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+# Allow importing sibling scripts when running from repo root (python scripts/setup_transforms.py)
+_scripts_dir = os.path.dirname(os.path.abspath(__file__))
+if _scripts_dir not in sys.path:
+    sys.path.insert(0, _scripts_dir)
+from seed_demo_data import get_es_client, index_name
+
+_repo_root = os.path.dirname(_scripts_dir)
+DASHBOARD_SOURCE = os.path.join(_repo_root, "dashboards", "spiketrace_dashboard.ndjson")
+DASHBOARD_ROLLUP = os.path.join(_repo_root, "dashboards", "spiketrace_dashboard_rollup.ndjson")
+
+MINUTE = {"date_histogram": {"field": "@timestamp", "fixed_interval": "1m"}}
+
+
+def _squared(field: str) -> dict:
+    return {"sum": {"script": {"source": f"double v = doc['{field}'].size() == 0 ? 0 : doc['{field}'].value; return v * v;"}}}
+
+
+def _std_dev(prefix: str) -> dict:
+    # Population std dev, matching Lens' standard_deviation (extended_stats).
+    return {
+        "bucket_script": {
+            "buckets_path": {"n": f"{prefix}_n", "s": f"{prefix}_sum", "q": f"{prefix}_sumsq"},
+            "script": "params.n > 0 ? Math.sqrt(Math.max(0, params.q / params.n - Math.pow(params.s / params.n, 2))) : null",
+        }
+    }
+
+
+# name -> (source index base, group_by, aggregations)
+TRANSFORMS = {
+    "carbon-service-1m": (
+        "carbon-metrics-*",
+        {"@timestamp": MINUTE, "service": {"terms": {"field": "service"}}, "region": {"terms": {"field": "region"}}},
+        {
+            "service_co2_grams": {"sum": {"field": "estimated_co2_grams"}},
+            "service_avg_cpu_pct": {"avg": {"field": "cpu_pct"}},
+            "service_points": {"value_count": {"field": "estimated_co2_grams"}},
+        },
+    ),
+    "carbon-1m": (
+        "carbon-metrics-*",
+        {"@timestamp": MINUTE},
+        {
+            "co2_n": {"value_count": {"field": "estimated_co2_grams"}},
+            "co2_sum": {"sum": {"field": "estimated_co2_grams"}},
+            "co2_sumsq": _squared("estimated_co2_grams"),
+            "co2_std": _std_dev("co2"),
+        },
+    ),
+    "emissions-region-1m": (
+        "carbon-metrics-*",
+        {"@timestamp": MINUTE, "region": {"terms": {"field": "region"}}},
+        {
+            "region_emissions_n": {"value_count": {"field": "emissions_kg_co2e"}},
+            "region_emissions_sum": {"sum": {"field": "emissions_kg_co2e"}},
+            "region_emissions_sumsq": _squared("emissions_kg_co2e"),
+            "region_emissions_std": _std_dev("region_emissions"),
+        },
+    ),
+    "latency-1m": (
+        "logs-*",
+        {"@timestamp": MINUTE},
+        {
+            "latency": {"percentiles": {"field": "latency_ms", "percents": [50, 95, 99]}},
+            "latency_p50_ms": {"bucket_script": {"buckets_path": {"p": "latency[50.0]"}, "script": "params.p"}},
+            "latency_count": {"value_count": {"field": "latency_ms"}},
+        },
+    ),
+}
+
+# Lens columns to repoint at the summary fields: lens id -> column id -> new column settings.
+COLUMN_REWRITES = {
+    "8329384e-1396-44b9-a26c-4ba185f06a22": {
+        "6bcda086-851d-492d-91e5-66617adfae77": {"operationType": "sum", "sourceField": "service_co2_grams"},
+    },
+    "b4c36ed3-d6cb-4b90-a763-3bcaabd764f5": {
+        "54b9ed7a-3a85-4047-8cac-023cf2a2b07d": {
+            "operationType": "median",
+            "sourceField": "latency_p50_ms",
+            "label": "Latency p50 (ms, approx.)",
+            "customLabel": True,
+        },
+    },
+}
+
+# Standard deviation columns replaced by a formula over a transform's n/sum/sumsq fields: lens id -> column id -> prefix.
+STD_DEV_FORMULAS = {
+    "cc602211-3357-46d6-84ec-bb085d0a837f": {"4f32147f-35b8-4758-981e-dcd1e2b06220": "co2"},
+    "db0028ed-9c33-4193-8555-c894b8567933": {"cb1f8184-38df-4c40-807b-bb7b12f18d52": "region_emissions"},
+}
+
+
+def _std_dev_formula(column_id: str, prefix: str, label: str) -> dict:
+    """Lens formula column (plus its helper columns) for the exact population std dev over any interval."""
+    n, s, q, math = (f"{column_id}X{i}" for i in range(4))
+    formula = f"sqrt(sum({prefix}_sumsq) / sum({prefix}_n) - pow(sum({prefix}_sum) / sum({prefix}_n), 2))"
+    part = {"customLabel": True, "dataType": "number", "isBucketed": False, "label": f"Part of {label}", "scale": "ratio"}
+    columns = {
+        helper_id: {**part, "operationType": "sum", "params": {"emptyAsNull": False}, "sourceField": f"{prefix}_{field}"}
+        for helper_id, field in ((n, "n"), (s, "sum"), (q, "sumsq"))
+    }
+    ast = {
+        "type": "function",
+        "name": "sqrt",
+        "args": [{
+            "type": "function",
+            "name": "subtract",
+            "args": [
+                {"type": "function", "name": "divide", "args": [q, n]},
+                {"type": "function", "name": "pow", "args": [{"type": "function", "name": "divide", "args": [s, n]}, 2]},
+            ],
+        }],
+    }
+    columns[math] = {**part, "operationType": "math", "params": {"tinymathAst": ast}, "references": [n, s, q]}
+    columns[column_id] = {
+        "customLabel": True,
+        "dataType": "number",
+        "isBucketed": False,
+        "label": label,
+        "operationType": "formula",
+        "params": {"formula": formula, "isFormulaBroken": False},
+        "references": [math],
+        "scale": "ratio",
+    }
+    return columns
+
+
+def transform_id(name: str) -> str:
+    return index_name("spiketrace", f"rollup-{name}")
+
+
+def transform_body(name: str, frequency: str, delay: str) -> dict:
+    source, group_by, aggregations = TRANSFORMS[name]
+    return {
+        "source": {"index": [index_name("spiketrace", source)]},
+        "dest": {"index": transform_id(name)},
+        "pivot": {"group_by": group_by, "aggregations": aggregations},
+        "sync": {"time": {"field": "@timestamp", "delay": delay}},
+        "frequency": frequency,
+        "description": f"SpikeTrace dashboard rollup: {name}",
+    }
+
+
+def _rollup_id(original_id: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"spiketrace-rollup/{original_id}"))
+
+
+def build_rollup_dashboard(source_path: str = DASHBOARD_SOURCE) -> list[dict]:
+    """Clone the dashboard export onto one `<prefix>-rollup-*` data view with rewritten Lens columns."""
+    with open(source_path, encoding="utf-8") as f:
+        objects = [json.loads(line) for line in f if line.strip()]
+
+    index_patterns = [o for o in objects if o.get("type") == "index-pattern"]
+    rollup_view_id = _rollup_id("index-pattern")
+    rollup_title = index_name("spiketrace", "rollup-*")
+    out = [
+        {
+            "attributes": {
+                "allowHidden": False,
+                "fieldAttrs": "{}",
+                "fieldFormatMap": "{}",
+                "fields": "[]",
+                "name": "SpikeTrace Rollups",
+                "runtimeFieldMap": "{}",
+                "sourceFilters": "[]",
+                "timeFieldName": "@timestamp",
+                "title": rollup_title,
+            },
+            "coreMigrationVersion": "8.8.0",
+            "id": rollup_view_id,
+            "managed": False,
+            "references": [],
+            "type": "index-pattern",
+            "typeMigrationVersion": "8.0.0",
+        }
+    ]
+    for obj in objects:
+        if obj.get("type") not in ("lens", "dashboard"):
+            continue
+        text = json.dumps(obj)
+        for pattern in index_patterns:
+            text = text.replace(pattern["id"], rollup_view_id)
+            text = text.replace(json.dumps(pattern["attributes"]["title"]), json.dumps(rollup_title))
+        for original_id in [o["id"] for o in objects if o.get("type") in ("lens", "dashboard")]:
+            text = text.replace(original_id, _rollup_id(original_id))
+        clone = json.loads(text)
+        clone.pop("version", None)
+        attributes = clone["attributes"]
+        if obj["type"] == "lens":
+            layers = attributes["state"]["datasourceStates"]["formBased"]["layers"]
+            for layer in layers.values():
+                for column_id, rewrite in COLUMN_REWRITES.get(obj["id"], {}).items():
+                    if column_id in layer["columns"]:
+                        layer["columns"][column_id].update(rewrite)
+                for column_id, prefix in STD_DEV_FORMULAS.get(obj["id"], {}).items():
+                    if column_id not in layer["columns"]:
+                        continue
+                    columns = _std_dev_formula(column_id, prefix, layer["columns"][column_id]["label"])
+                    layer["columns"].update(columns)
+                    layer["columnOrder"] += [c for c in columns if c not in layer["columnOrder"]]
+                    # Lens cannot rank terms by a formula, so those split alphabetically instead.
+                    for column in layer["columns"].values():
+                        if column.get("params", {}).get("orderBy", {}).get("columnId") == column_id:
+                            column["params"]["orderBy"] = {"type": "alphabetical", "fallback": True}
+            attributes["title"] = f"{attributes['title']} (rollup)"
+        else:
+            attributes["title"] = f"{attributes['title']} (Rollup)"
+        out.append(clone)
+    out.append({"excludedObjects": [], "excludedObjectsCount": 0, "exportedCount": len(out), "missingRefCount": 0, "missingReferences": []})
+    return out
+
+
+def write_rollup_dashboard(path: str = DASHBOARD_ROLLUP) -> int:
+    objects = build_rollup_dashboard()
+    with open(path, "w", encoding="utf-8") as f:
+        for obj in objects:
+            f.write(json.dumps(obj) + "\n")
+    return len(objects) - 1
+
+
+def setup(es, frequency: str, delay: str, recreate: bool) -> None:
+    for name in TRANSFORMS:
+        tid = transform_id(name)
+        exists = es.transform.get_transform(transform_id=tid, allow_no_match=True)["count"] > 0
+        if exists and not recreate:
+            print(f"{tid}: exists, leaving as is (use --recreate to replace)")
+            continue
+        if exists:
+            es.transform.stop_transform(transform_id=tid, force=True, wait_for_completion=True)
+            es.transform.delete_transform(transform_id=tid, delete_dest_index=True)
+        es.transform.put_transform(transform_id=tid, **transform_body(name, frequency, delay))
+        es.transform.start_transform(transform_id=tid)
+        print(f"{tid}: created and started")
+
+
+def _std_dev_parts(prefix: str) -> dict:
+    # What the rollup formula columns request: the sums of n, sum and sum of squares.
+    return {field: {"sum": {"field": f"{prefix}_{field}"}} for field in ("n", "sum", "sumsq")}
+
+
+# Equivalent aggregations for one panel, raw vs rollup, used by --benchmark-days.
+def _panel_queries(days: int) -> dict:
+    window = {"range": {"@timestamp": {"gte": f"now-{days}d"}}}
+    hist = {"date_histogram": {"field": "@timestamp", "fixed_interval": "1h"}}
+    return {
+        "co2_by_service": (
+            ("carbon-metrics-*", {"s": {"terms": {"field": "service", "size": 5}, "aggs": {"v": {"sum": {"field": "estimated_co2_grams"}}}}}),
+            ("rollup-carbon-service-1m", {"s": {"terms": {"field": "service", "size": 5}, "aggs": {"v": {"sum": {"field": "service_co2_grams"}}}}}),
+        ),
+        "co2_over_time": (
+            ("carbon-metrics-*", {"t": {**hist, "aggs": {"v": {"extended_stats": {"field": "estimated_co2_grams"}}}}}),
+            ("rollup-carbon-1m", {"t": {**hist, "aggs": _std_dev_parts("co2")}}),
+        ),
+        "emissions_by_region": (
+            ("carbon-metrics-*", {"r": {"terms": {"field": "region", "size": 2}, "aggs": {"t": {**hist, "aggs": {"v": {"extended_stats": {"field": "emissions_kg_co2e"}}}}}}}),
+            ("rollup-emissions-region-1m", {"r": {"terms": {"field": "region", "size": 2}, "aggs": {"t": {**hist, "aggs": _std_dev_parts("region_emissions")}}}}),
+        ),
+        "latency_over_time": (
+            ("logs-*", {"t": {**hist, "aggs": {"v": {"percentiles": {"field": "latency_ms", "percents": [50]}}}}}),
+            ("rollup-latency-1m", {"t": {**hist, "aggs": {"v": {"percentiles": {"field": "latency_p50_ms", "percents": [50]}}}}}),
+        ),
+    }, window
+
+
+def benchmark(es, days: int, repeat: int = 3) -> None:
+    queries, window = _panel_queries(days)
+    print(f"{'panel':<22} {'raw ms':>8} {'rollup ms':>10}")
+    for panel, variants in queries.items():
+        timings = []
+        for base, aggs in variants:
+            best = None
+            for _ in range(repeat):
+                resp = es.search(index=index_name("spiketrace", base), query=window, aggs=aggs, size=0, request_cache=False)
+                best = resp["took"] if best is None else min(best, resp["took"])
+            timings.append(best)
+        print(f"{panel:<22} {timings[0]:>8} {timings[1]:>10}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Create dashboard rollup transforms and the rollup dashboard export.")
+    parser.add_argument("--frequency", default="1m", help="How often each transform checks for new data (default: 1m)")
+    parser.add_argument("--delay", default="60s", help="Ingest delay tolerated before a minute is final (default: 60s)")
+    parser.add_argument("--recreate", action="store_true", help="Stop, delete and recreate existing transforms and their indices")
+    parser.add_argument("--dry-run", action="store_true", help="Print transform bodies without calling Elasticsearch")
+    parser.add_argument("--skip-dashboard", action="store_true", help="Do not rewrite dashboards/spiketrace_dashboard_rollup.ndjson")
+    parser.add_argument("--benchmark-days", type=int, default=0,
+                        help="Time each panel's aggregation on raw vs rollup indices over N days and exit")
+    args = parser.parse_args(argv)
+
+    if args.dry_run:
+        for name in TRANSFORMS:
+            print(f"PUT _transform/{transform_id(name)}")
+            print(json.dumps(transform_body(name, args.frequency, args.delay), indent=2))
+        return
+
+    if not args.skip_dashboard:
+        count = write_rollup_dashboard()
+        print(f"Wrote {count} saved objects to {os.path.relpath(DASHBOARD_ROLLUP, _repo_root)}")
+
+    es = get_es_client()
+    if args.benchmark_days:
+        benchmark(es, args.benchmark_days)
+        return
+    started = time.perf_counter()
+    setup(es, args.frequency, args.delay, args.recreate)
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
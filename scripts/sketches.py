@@ -0,0 +1,174 @@
+"""
+Mergeable streaming quantile sketch (DDSketch) for baselines and latency analytics.
+
+DDSketch buckets values on a logarithmic scale so every quantile estimate is
+within a fixed *relative* error (alpha, 1% by default) of the true value, and two
+sketches merge by adding bucket counts - so per-bucket sketches built at ingest
+can be combined over any window without re-reading raw data.
+
+Values are expected to be non-negative (CPU %, grams, latency ms, rates);
+anything at or below MIN_INDEXABLE is counted in a dedicated zero bucket.
+
+Memory is bounded the way the reference DDSketch's collapsing-lowest store
+does it: the bucket keys may span at most max_bins, and once the span would
+grow past that a fixed collapse floor is raised so every value below it is
+counted in the floor bucket. Quantiles above the floor keep the relative
+accuracy guarantee; ones that land in the floor bucket are only upper bounds.
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, Optional
+
+MIN_INDEXABLE = 1e-9
+
+
+class DDSketch:
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, float] = {}
+        # Lowest retained key once the sketch has collapsed; lower keys are counted here.
+        self.collapse_floor: Optional[int] = None
+        self.zero_count = 0.0
+        self.count = 0.0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        # Midpoint (in relative terms) of the bucket (gamma^(k-1), gamma^k].
+        return 2.0 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        if value is None or weight <= 0:
+            return
+        if value <= MIN_INDEXABLE:
+            self.zero_count += weight
+        else:
+            self._insert(self._key(value), weight)
+            self._collapse()
+        self.count += weight
+        self.sum += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def extend(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.add(value)
+
+    def _insert(self, key: int, weight: float) -> None:
+        if self.collapse_floor is not None and key < self.collapse_floor:
+            key = self.collapse_floor
+        self.bins[key] = self.bins.get(key, 0.0) + weight
+
+    def _collapse(self) -> None:
+        # Keep the key span within max_bins by raising the floor; it never moves down again.
+        if not self.bins:
+            return
+        floor = max(self.bins) - self.max_bins + 1
+        if self.collapse_floor is not None and floor <= self.collapse_floor:
+            return
+        low = [key for key in self.bins if key < floor]
+        if not low:
+            return
+        self.collapse_floor = floor
+        for key in low:
+            self.bins[floor] = self.bins.get(floor, 0.0) + self.bins.pop(key)
+
+    def merge(self, other: "DDSketch") -> None:
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        if other.collapse_floor is not None and (
+            self.collapse_floor is None or other.collapse_floor > self.collapse_floor
+        ):
+            self.collapse_floor = other.collapse_floor
+            for key in [k for k in self.bins if k < self.collapse_floor]:
+                self._insert(key, self.bins.pop(key))
+        for key, count in other.bins.items():
+            self._insert(key, count)
+        self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        if not 0 <= q <= 1:
+            raise ValueError("q must be in [0, 1]")
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        running = self.zero_count
+        for key in sorted(self.bins):
+            running += self.bins[key]
+            if running > rank:
+                return min(max(self._value(key), self.min), self.max)
+        return self.max
+
+    def quantiles(self, qs: Iterable[float]) -> Dict[str, Optional[float]]:
+        """Several quantiles in one pass over the sorted buckets, keyed like "p95"."""
+        qs = sorted(qs)
+        out: Dict[str, Optional[float]] = {}
+        if self.count == 0:
+            return {_label(q): None for q in qs}
+        keys = sorted(self.bins)
+        running = self.zero_count
+        i = 0
+        for q in qs:
+            rank = q * (self.count - 1)
+            if rank < self.zero_count:
+                out[_label(q)] = 0.0
+                continue
+            while i < len(keys) and running + self.bins[keys[i]] <= rank:
+                running += self.bins[keys[i]]
+                i += 1
+            value = self._value(keys[i]) if i < len(keys) else self.max
+            out[_label(q)] = min(max(value, self.min), self.max)
+        return out
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_bins": self.max_bins,
+            # JSON object keys must be strings.
+            "bins": {str(k): v for k, v in self.bins.items()},
+            "collapse_floor": self.collapse_floor,
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DDSketch":
+        sketch = cls(data.get("relative_accuracy", 0.01), data.get("max_bins", 2048))
+        sketch.bins = {int(k): float(v) for k, v in (data.get("bins") or {}).items()}
+        if data.get("collapse_floor") is not None:
+            sketch.collapse_floor = int(data["collapse_floor"])
+        sketch.zero_count = float(data.get("zero_count", 0.0))
+        sketch.count = float(data.get("count", 0.0))
+        sketch.sum = float(data.get("sum", 0.0))
+        sketch.min = data["min"] if data.get("min") is not None else math.inf
+        sketch.max = data["max"] if data.get("max") is not None else -math.inf
+        return sketch
+
+
+def _label(q: float) -> str:
+    pct = q * 100
+    return f"p{int(pct)}" if pct == int(pct) else f"p{pct:g}"
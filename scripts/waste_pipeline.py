@@ -0,0 +1,229 @@
+"""
+Excess-runtime waste pipeline: precomputes wasted CPU-seconds and CO2 per
+error_type / deployment_id and materializes them into a summary index.
+
+For every (service, region, 5-minute bucket) it joins:
+  - retry/error log counts and latency, grouped by error_type and deployment_id
+  - total request latency in the same bucket (all log lines)
+  - the matching carbon-metrics bucket (SUM(estimated_co2_grams))
+
+Wasted CPU-seconds are the request time spent in retried/failed calls, and the
+bucket's CO2 is attributed to each error_type/deployment by its share of that
+bucket's total request time. Results are upserted with deterministic ids into
+`<prefix>-waste-attribution`, so the agent's `waste_attribution` tool becomes a
+lookup instead of LLM arithmetic.
+
+The lookback is processed in bucket-aligned chunks, each re-split until every
+ES|QL result fits under its row LIMIT, so long lookbacks never drop rows.
+
+Usage (example):
+  python scripts/waste_pipeline.py --lookback 6h             # one run
+  python scripts/waste_pipeline.py --lookback 2h --every 300 # scheduled
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from elasticsearch import helpers
+
+# Allow importing sibling scripts when running from repo root (python scripts/waste_pipeline.py)
+_scripts_dir = os.path.dirname(os.path.abspath(__file__))
+if _scripts_dir not in sys.path:
+    sys.path.insert(0, _scripts_dir)
+from seed_demo_data import get_es_client, index_name
+
+
+BUCKET_MINUTES = 5
+# ES|QL row cap per query. Windows whose results hit it are split in half and re-queried.
+ROW_LIMIT = 10000
+# Initial chunk length; long lookbacks (e.g. 7d) are processed one chunk at a time.
+CHUNK = timedelta(hours=6)
+
+WASTE_BY_CAUSE_QUERY = """
+FROM {logs}
+| WHERE @timestamp >= TO_DATETIME(?) AND @timestamp < TO_DATETIME(?)
+| WHERE retry == true OR level == "ERROR"
+| STATS retry_count = COUNT(*), wasted_ms = SUM(latency_ms)
+  BY service, region, error_type, deployment_id, bucket_ts = BUCKET(@timestamp, {bucket} minutes)
+| LIMIT {limit}
+"""
+
+TOTAL_RUNTIME_QUERY = """
+FROM {logs}
+| WHERE @timestamp >= TO_DATETIME(?) AND @timestamp < TO_DATETIME(?)
+| STATS request_count = COUNT(*), total_ms = SUM(latency_ms)
+  BY service, region, bucket_ts = BUCKET(@timestamp, {bucket} minutes)
+| LIMIT {limit}
+"""
+
+CARBON_QUERY = """
+FROM {metrics}
+| WHERE @timestamp >= TO_DATETIME(?) AND @timestamp < TO_DATETIME(?)
+| STATS co2_grams = SUM(estimated_co2_grams), avg_cpu = AVG(cpu_pct)
+  BY service, region, bucket_ts = BUCKET(@timestamp, {bucket} minutes)
+| LIMIT {limit}
+"""
+
+WASTE_INDEX_MAPPINGS = {
+    "properties": {
+        "@timestamp": {"type": "date"},
+        "service": {"type": "keyword"},
+        "region": {"type": "keyword"},
+        "error_type": {"type": "keyword"},
+        "deployment_id": {"type": "keyword"},
+        "bucket_minutes": {"type": "integer"},
+        "retry_count": {"type": "long"},
+        "wasted_cpu_seconds": {"type": "float"},
+        "bucket_cpu_seconds": {"type": "float"},
+        "waste_share": {"type": "float"},
+        "bucket_co2_grams": {"type": "float"},
+        "wasted_co2_grams": {"type": "float"},
+        "wasted_emissions_kg_co2e": {"type": "float"},
+        "computed_at": {"type": "date"},
+    }
+}
+
+
+def _esql_rows(es, query: str, start: datetime, end: datetime) -> list[dict]:
+    resp = es.esql.query(query=query, params=[start.isoformat(), end.isoformat()])
+    names = [c["name"] for c in resp["columns"]]
+    return [dict(zip(names, values)) for values in resp["values"]]
+
+
+def attribute_waste(waste_rows: list[dict], total_rows: list[dict], carbon_rows: list[dict]) -> list[dict]:
+    """
+    Join the three bucketed result sets and attribute CO2 to each error cause.
+
+    A cause's share of a bucket is wasted_ms / total_ms for that service/region/
+    bucket (capped at 1); its wasted CO2 is that share of the bucket's CO2.
+    Buckets with no carbon metrics still report wasted CPU-seconds with 0 g CO2.
+    Rows whose bucket has no totals row are skipped: without total_ms the share
+    is unknown, and assuming 1.0 would count the whole bucket's CO2 as waste.
+    """
+    totals = {(r["service"], r["region"], r["bucket_ts"]): r for r in total_rows}
+    carbon = {(r["service"], r["region"], r["bucket_ts"]): r for r in carbon_rows}
+
+    out = []
+    for row in waste_rows:
+        key = (row["service"], row["region"], row["bucket_ts"])
+        total_ms = (totals.get(key) or {}).get("total_ms")
+        if total_ms is None:
+            continue
+        wasted_ms = row.get("wasted_ms") or 0.0
+        share = min(wasted_ms / total_ms, 1.0) if total_ms else 0.0
+        bucket_co2 = (carbon.get(key) or {}).get("co2_grams") or 0.0
+        wasted_co2 = bucket_co2 * share
+        out.append(
+            {
+                "@timestamp": row["bucket_ts"],
+                "service": row["service"],
+                "region": row["region"],
+                "error_type": row.get("error_type"),
+                "deployment_id": row.get("deployment_id"),
+                "bucket_minutes": BUCKET_MINUTES,
+                "retry_count": row.get("retry_count") or 0,
+                "wasted_cpu_seconds": wasted_ms / 1000.0,
+                "bucket_cpu_seconds": total_ms / 1000.0,
+                "waste_share": share,
+                "bucket_co2_grams": bucket_co2,
+                "wasted_co2_grams": wasted_co2,
+                "wasted_emissions_kg_co2e": wasted_co2 / 1000.0,
+            }
+        )
+    return out
+
+
+def _doc_id(doc: dict) -> str:
+    # Deterministic so re-running over an overlapping window overwrites, not duplicates.
+    key = "|".join(
+        str(doc.get(f) or "") for f in ("service", "region", "error_type", "deployment_id", "@timestamp")
+    )
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _floor_to_bucket(ts: datetime) -> datetime:
+    return ts.replace(minute=ts.minute - ts.minute % BUCKET_MINUTES, second=0, microsecond=0)
+
+
+def _attribute_window(es, start: datetime, end: datetime) -> tuple[list[dict], int]:
+    """Waste docs for [start, end) and the number of skipped rows; halves the window while results hit ROW_LIMIT."""
+    logs = index_name("spiketrace", "logs-*")
+    metrics = index_name("spiketrace", "carbon-metrics-*")
+    fmt = {"logs": logs, "metrics": metrics, "bucket": BUCKET_MINUTES, "limit": ROW_LIMIT}
+    results = [
+        _esql_rows(es, query.format(**fmt), start, end)
+        for query in (WASTE_BY_CAUSE_QUERY, TOTAL_RUNTIME_QUERY, CARBON_QUERY)
+    ]
+    if any(len(rows) >= ROW_LIMIT for rows in results):
+        buckets = (end - start) // timedelta(minutes=BUCKET_MINUTES)
+        if buckets < 2:
+            raise RuntimeError(f"More than {ROW_LIMIT} rows in one {BUCKET_MINUTES}-minute bucket at {start}")
+        mid = start + timedelta(minutes=BUCKET_MINUTES) * (buckets // 2)
+        left, left_skipped = _attribute_window(es, start, mid)
+        right, right_skipped = _attribute_window(es, mid, end)
+        return left + right, left_skipped + right_skipped
+    waste_rows, total_rows, carbon_rows = results
+    docs = attribute_waste(waste_rows, total_rows, carbon_rows)
+    return docs, len(waste_rows) - len(docs)
+
+
+def run_once(es, lookback: timedelta) -> int:
+    # Both ends sit on bucket boundaries, so the in-progress bucket and partial buckets are never written.
+    end = _floor_to_bucket(datetime.now(timezone.utc))
+    start = _floor_to_bucket(end - lookback)
+
+    computed_at = datetime.now(timezone.utc).isoformat()
+    target = index_name("spiketrace", "waste-attribution")
+    written = skipped = 0
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(end, chunk_start + CHUNK)
+        docs, chunk_skipped = _attribute_window(es, chunk_start, chunk_end)
+        skipped += chunk_skipped
+        actions = []
+        for doc in docs:
+            doc["computed_at"] = computed_at
+            actions.append({"_index": target, "_id": _doc_id(doc), "_source": doc})
+        if actions:
+            helpers.bulk(es, actions)
+        written += len(actions)
+        chunk_start = chunk_end
+    if skipped:
+        print(f"Skipped {skipped} waste rows whose bucket had no request totals")
+    return written
+
+
+def _parse_duration(value: str) -> timedelta:
+    units = {"m": "minutes", "h": "hours", "d": "days"}
+    if not value or value[-1] not in units:
+        raise argparse.ArgumentTypeError("Use a duration like 30m, 6h or 7d")
+    return timedelta(**{units[value[-1]]: float(value[:-1])})
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Materialize excess-runtime waste attribution.")
+    parser.add_argument("--lookback", type=_parse_duration, default=timedelta(hours=6),
+                        help="Window to (re)compute, e.g. 2h or 7d (default: 6h)")
+    parser.add_argument("--every", type=float, default=0.0,
+                        help="Re-run every N seconds; 0 runs once (default: 0)")
+    args = parser.parse_args(argv)
+
+    es = get_es_client()
+    target = index_name("spiketrace", "waste-attribution")
+    if not es.indices.exists(index=target):
+        es.indices.create(index=target, mappings=WASTE_INDEX_MAPPINGS)
+
+    while True:
+        written = run_once(es, args.lookback)
+        print(f"{datetime.now(timezone.utc).isoformat()} wrote {written} waste attribution rows to {target}")
+        if args.every <= 0:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+O(1) deviation scoring against the precomputed baseline profiles.
+
+scripts/baseline_profiles.py maintains one document per (service, region,
+hour_of_week) in `<prefix>-baselines` with percentiles per metric. This module
+keeps those documents in memory (refreshed every `refresh_seconds`) and scores a
+point with a dict lookup plus a few arithmetic operations.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from es_client import get_es_client, index_name  # also puts scripts/ on sys.path
+from baseline_profiles import BASELINE_METRICS, hour_of_week, profile_id
+
+# IQR / 1.349 estimates the standard deviation of a normal distribution,
+# giving a z-like score that is robust to the spikes we are looking for.
+_IQR_TO_SIGMA = 1.349
+PIT_KEEP_ALIVE = "1m"
+PAGE_SIZE = 5000
+
+
+def _band(value: float, p: dict) -> str:
+    for label in ("p99", "p95", "p75"):
+        if p.get(label) is not None and value > p[label]:
+            return f">{label}"
+    if p.get("p5") is not None and value < p["p5"]:
+        return "<p5"
+    return "normal"
+
+
+class BaselineProfiles:
+    def __init__(self, refresh_seconds: float = 300.0):
+        self.refresh_seconds = refresh_seconds
+        self._profiles: dict[str, dict] = {}
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _load(self) -> dict[str, dict]:
+        """Every profile document, paged over a PIT with search_after (one doc per service/region/hour)."""
+        from elasticsearch import NotFoundError
+
+        es = get_es_client()
+        try:
+            pit_id = es.open_point_in_time(index=index_name("spiketrace", "baselines"), keep_alive=PIT_KEEP_ALIVE)["id"]
+        except NotFoundError:
+            # scripts/baseline_profiles.py has not created the index yet; every score is "no_baseline".
+            return {}
+        profiles: dict[str, dict] = {}
+        search_after = None
+        try:
+            while True:
+                resp = es.search(
+                    pit={"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+                    query={"term": {"kind": "profile"}},
+                    source_excludes=["sketches"],
+                    sort=[{"_shard_doc": "asc"}],
+                    size=PAGE_SIZE,
+                    search_after=search_after,
+                    track_total_hits=False,
+                )
+                pit_id = resp.get("pit_id", pit_id)
+                hits = resp["hits"]["hits"]
+                for hit in hits:
+                    profiles[hit["_id"]] = hit["_source"]
+                if len(hits) < PAGE_SIZE:
+                    return profiles
+                search_after = hits[-1]["sort"]
+        finally:
+            es.close_point_in_time(id=pit_id)
+
+    async def _ensure_fresh(self) -> None:
+        if time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        async with self._lock:
+            if time.monotonic() - self._loaded_at < self.refresh_seconds:
+                return
+            self._profiles = await asyncio.to_thread(self._load)
+            self._loaded_at = time.monotonic()
+
+    async def profile(self, service: str, region: str, ts: datetime | None = None) -> dict | None:
+        await self._ensure_fresh()
+        how = hour_of_week(ts or datetime.now(timezone.utc))
+        return self._profiles.get(profile_id(service, region, how))
+
+    async def score(self, service: str, region: str, metric: str, value: float, ts: datetime | None = None) -> dict:
+        if metric not in BASELINE_METRICS:
+            raise ValueError(f"metric must be one of {', '.join(BASELINE_METRICS)}")
+        ts = ts or datetime.now(timezone.utc)
+        profile = await self.profile(service, region, ts)
+        result = {"service": service, "region": region, "metric": metric, "value": value, "hour_of_week": hour_of_week(ts)}
+        p = (profile or {}).get("percentiles", {}).get(metric)
+        if not p or p.get("p50") is None:
+            return {**result, "baseline": None, "robust_z": None, "band": "no_baseline"}
+
+        sigma = ((p.get("p75") or 0.0) - (p.get("p25") or 0.0)) / _IQR_TO_SIGMA
+        robust_z = (value - p["p50"]) / sigma if sigma > 0 else None
+        return {
+            **result,
+            "baseline": p,
+            "robust_z": round(robust_z, 2) if robust_z is not None else None,
+            "deviation_pct": round(100.0 * (value - p["p50"]) / p["p50"], 2) if p["p50"] else None,
+            "band": _band(value, p),
+        }
+
+    async def week_profile(self, service: str, region: str) -> list[dict]:
+        """All 168 hour-of-week percentile rows for a service/region (missing hours omitted)."""
+        await self._ensure_fresh()
+        rows = []
+        for how in range(168):
+            doc = self._profiles.get(profile_id(service, region, how))
+            if doc is not None:
+                rows.append({"hour_of_week": how, "percentiles": doc.get("percentiles", {})})
+        return rows
@@ -0,0 +1,42 @@
+"""
+Shared Elasticsearch access for the backend analytics APIs.
+
+One client per process (built by scripts/seed_demo_data.py, which also owns
+index_name; the elasticsearch client pools connections and is thread-safe),
+ES|QL results as lists of dicts, and an async wrapper that runs the blocking
+client in a worker thread so several queries can fan out concurrently from a
+request handler.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from elasticsearch import Elasticsearch
+
+# scripts/ holds carbon_utils and the offline jobs whose helpers the APIs reuse.
+_scripts_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+if _scripts_dir not in sys.path:
+    sys.path.insert(0, _scripts_dir)
+# One connection helper and one index_name(prefix, base) for the scripts and the APIs.
+from seed_demo_data import get_es_client as _connect, index_name  # noqa: E402
+
+
+@lru_cache(maxsize=1)
+def get_es_client() -> Elasticsearch:
+    """The process-wide client from seed_demo_data.get_es_client (it pools connections)."""
+    return _connect()
+
+
+def run_esql(query: str, params: list | None = None) -> list[dict]:
+    resp = get_es_client().esql.query(query=query, params=params or [])
+    names = [c["name"] for c in resp["columns"]]
+    return [dict(zip(names, values)) for values in resp["values"]]
+
+
+async def run_esql_async(query: str, params: list | None = None) -> list[dict]:
+    return await asyncio.to_thread(run_esql, query, params)
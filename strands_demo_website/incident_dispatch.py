@@ -0,0 +1,248 @@
+"""
+Incident dispatch queue: deduplicated, batched Jira + Slack notifications.
+
+The `create_incident` workflow makes one Jira call and one Slack post per
+agent call, so a retry storm seen by many chats opens duplicate incidents.
+This queue sits in front of Jira/Slack instead:
+
+  - fingerprint dedupe on (service, region, deployment_id, time bucket), plus
+    the normalized summary when neither service nor region is given; the
+    seen-set lives in SharedState so it holds across workers
+  - a short batching window collects incidents submitted close together
+  - one Jira issue per distinct incident, one coalesced Slack message per batch
+  - async workers retry failed calls with exponential backoff and jitter
+  - on shutdown, queued incidents get a short grace period to go out; the
+    fingerprints of any still unsent are released so they can be resubmitted
+
+Targets come from SPIKETRACE_JIRA_URL / SPIKETRACE_SLACK_WEBHOOK_URL; the
+mock endpoints in mock_integrations.py stand in for both during testing.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from shared_state import SharedState
+
+if TYPE_CHECKING:
+    import httpx
+
+
+@dataclass
+class IncidentRequest:
+    summary: str
+    description: str = ""
+    service: str = ""
+    region: str = ""
+    deployment_id: str = ""
+    severity: str = "high"
+    issue_type: str = "10054"
+    submitted_at: float = field(default_factory=time.time)
+
+    def fingerprint(self, bucket_seconds: float) -> str:
+        bucket = int(self.submitted_at // bucket_seconds)
+        parts = [self.service, self.region, self.deployment_id, str(bucket)]
+        if not self.service and not self.region:
+            # Without a location, only the same incident text counts as a duplicate.
+            parts.append(re.sub(r"\s+", " ", self.summary.strip().lower()))
+        return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class RetryableError(Exception):
+    """Raised for transport errors and 5xx/429 responses; other failures are not retried."""
+
+
+async def with_retries(call, *, attempts: int, base_delay: float, max_delay: float):
+    """Run `call()` retrying RetryableError with exponential backoff and full jitter."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return await call()
+        except RetryableError:
+            if attempt == attempts:
+                raise
+            await asyncio.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1))))
+
+
+async def _post(client: httpx.AsyncClient, url: str, payload: dict) -> dict:
+    import httpx
+
+    try:
+        resp = await client.post(url, json=payload)
+    except httpx.TransportError as e:
+        raise RetryableError(str(e)) from e
+    if resp.status_code == 429 or resp.status_code >= 500:
+        raise RetryableError(f"{url} returned {resp.status_code}")
+    resp.raise_for_status()
+    return resp.json() if resp.content else {}
+
+
+class IncidentDispatcher:
+    def __init__(
+        self,
+        state: SharedState,
+        jira_url: str,
+        slack_url: str,
+        *,
+        bucket_seconds: float = 900.0,
+        batch_window_seconds: float = 2.0,
+        max_batch_size: int = 50,
+        workers: int = 2,
+        attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+        drain_seconds: float = 10.0,
+        headers: dict | None = None,
+    ):
+        self.state = state
+        self.jira_url = jira_url
+        self.slack_url = slack_url
+        self.bucket_seconds = bucket_seconds
+        self.batch_window_seconds = batch_window_seconds
+        self.max_batch_size = max_batch_size
+        self.workers = workers
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.drain_seconds = drain_seconds
+        self.headers = headers or {}
+        self._incoming: asyncio.Queue = asyncio.Queue()
+        self._batches: asyncio.Queue = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self._client: httpx.AsyncClient | None = None
+        # Fingerprints reserved by submit() whose Jira issue has not been created (or given up on) yet.
+        self._unsent: set[str] = set()
+        self.stats = {
+            "submitted": 0, "duplicates": 0, "batches": 0, "jira_created": 0, "slack_sent": 0, "failed": 0,
+            "released_on_stop": 0,
+        }
+
+    @classmethod
+    def from_env(cls, state: SharedState, default_base_url: str = "http://127.0.0.1:8000") -> "IncidentDispatcher":
+        headers = {}
+        if os.getenv("SPIKETRACE_JIRA_AUTH"):
+            headers["Authorization"] = os.getenv("SPIKETRACE_JIRA_AUTH")
+        return cls(
+            state,
+            jira_url=os.getenv("SPIKETRACE_JIRA_URL", f"{default_base_url}/mock/jira/rest/api/2/issue"),
+            slack_url=os.getenv("SPIKETRACE_SLACK_WEBHOOK_URL", f"{default_base_url}/mock/slack/webhook"),
+            bucket_seconds=float(os.getenv("SPIKETRACE_INCIDENT_BUCKET_SECONDS", "900")),
+            batch_window_seconds=float(os.getenv("SPIKETRACE_INCIDENT_BATCH_SECONDS", "2")),
+            workers=int(os.getenv("SPIKETRACE_INCIDENT_WORKERS", "2")),
+            drain_seconds=float(os.getenv("SPIKETRACE_INCIDENT_DRAIN_SECONDS", "10")),
+            headers=headers,
+        )
+
+    async def start(self) -> None:
+        # Imported here so `import main` does not load httpx; the client is only needed once serving.
+        import httpx
+
+        self._client = httpx.AsyncClient(timeout=10.0, headers=self.headers)
+        self._tasks = [asyncio.create_task(self._batcher(), name="incident-batcher")]
+        self._tasks += [
+            asyncio.create_task(self._worker(), name=f"incident-worker-{i}") for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Give queued incidents up to drain_seconds to go out, then release the fingerprints of the rest."""
+        deadline = time.monotonic() + self.drain_seconds
+        while self._unsent and self._tasks and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        unsent, self._unsent = list(self._unsent), set()
+        for fp in unsent:
+            await asyncio.to_thread(self.state.delete, f"incident-fp:{fp}")
+        self.stats["released_on_stop"] += len(unsent)
+
+    async def submit(self, incident: IncidentRequest) -> dict:
+        """Queue an incident unless one with the same fingerprint was seen in this bucket."""
+        fp = incident.fingerprint(self.bucket_seconds)
+        self.stats["submitted"] += 1
+        # incr is atomic across workers: only the first submitter sees 1.
+        if await asyncio.to_thread(self.state.incr, f"incident-fp:{fp}", self.bucket_seconds * 2) > 1:
+            self.stats["duplicates"] += 1
+            jira = await asyncio.to_thread(self.state.get, f"incident-key:{fp}")
+            return {"status": "duplicate", "fingerprint": fp, "jira": jira}
+        self._unsent.add(fp)
+        self._incoming.put_nowait((fp, incident))
+        return {"status": "queued", "fingerprint": fp}
+
+    async def _batcher(self) -> None:
+        while True:
+            batch = [await self._incoming.get()]
+            deadline = time.monotonic() + self.batch_window_seconds
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._incoming.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.stats["batches"] += 1
+            await self._batches.put(batch)
+
+    async def _worker(self) -> None:
+        while True:
+            batch = await self._batches.get()
+            try:
+                await self._dispatch(batch)
+            except Exception:
+                # Keep the worker alive; per-call failures are already counted.
+                pass
+
+    def _retry(self, call):
+        return with_retries(call, attempts=self.attempts, base_delay=self.base_delay, max_delay=self.max_delay)
+
+    async def _dispatch(self, batch: list[tuple[str, IncidentRequest]]) -> None:
+        created = []
+        for fp, incident in batch:
+            payload = {
+                "fields": {
+                    "summary": incident.summary,
+                    "description": incident.description,
+                    "issuetype": {"id": incident.issue_type},
+                    "labels": [l for l in ("spiketrace", incident.service, incident.region, f"fp-{fp}") if l],
+                }
+            }
+            try:
+                result = await self._retry(lambda: _post(self._client, self.jira_url, payload))
+            except Exception:
+                self.stats["failed"] += 1
+                # Release the fingerprint so a later submission can try again.
+                self._unsent.discard(fp)
+                await asyncio.to_thread(self.state.delete, f"incident-fp:{fp}")
+                continue
+            self._unsent.discard(fp)
+            key = result.get("key")
+            await asyncio.to_thread(self.state.set, f"incident-key:{fp}", key, self.bucket_seconds * 2)
+            self.stats["jira_created"] += 1
+            created.append((incident, key))
+
+        if not created:
+            return
+        lines = [f"🚨 *SpikeTracer: {len(created)} incident(s) created*"]
+        for incident, key in created:
+            where = " / ".join(p for p in (incident.service, incident.region, incident.deployment_id) if p)
+            lines.append(f"• *{key or 'pending'}* [{incident.severity}] {incident.summary}" + (f" ({where})" if where else ""))
+        lines.append("_Generated automatically by SpikeTracer Agent_")
+        try:
+            await self._retry(lambda: _post(self._client, self.slack_url, {"text": "\n".join(lines)}))
+            self.stats["slack_sent"] += 1
+        except Exception:
+            self.stats["failed"] += 1
+
+    def describe(self) -> dict:
+        return {**self.stats, "queued": self._incoming.qsize(), "pending_batches": self._batches.qsize()}
+
@@ -0,0 +1,215 @@
+"""
+Investigation bundle: the agent's fixed investigation flow (confirm spike,
+errors, deployments, waste, business impact) as one backend call.
+
+The five ES|QL queries behind the individual tools run concurrently and their
+rows are reduced to a compact summary, so the agent needs a single tool round
+trip instead of five sequential ones. /api/chat also prefetches the bundle as
+soon as a question names a service and region, so by the time the agent calls
+the tool the result is usually already cached.
+
+Finished bundles live in SharedState, so every worker serves the same cached
+copy; only builds still in flight are tracked per process.
+"""
+import asyncio
+import logging
+import re
+import time
+
+from es_client import index_name, run_esql_async  # also puts scripts/ on sys.path
+from shared_state import Counters, SharedState
+
+logger = logging.getLogger(__name__)
+
+_WINDOW_RE = re.compile(r"^\s*(\d+)\s*(minute|hour|day|week)s?\s*$", re.IGNORECASE)
+_WINDOW_MINUTES = {"minute": 1, "hour": 60, "day": 24 * 60, "week": 7 * 24 * 60}
+
+SPIKE_QUERY = """
+FROM {metrics}
+| WHERE @timestamp > NOW() - TO_TIMEDURATION(?)
+| WHERE service == ? AND region == ?
+| STATS avg_cpu = AVG(cpu_pct), avg_co2 = AVG(estimated_co2_grams), avg_rps = AVG(requests_per_min)
+  BY bucket_ts = BUCKET(@timestamp, 10 minutes)
+| SORT bucket_ts ASC
+| LIMIT 1000
+"""
+
+ERRORS_QUERY = """
+FROM {logs}
+| WHERE @timestamp > NOW() - TO_TIMEDURATION(?)
+| WHERE service == ? AND region == ?
+| WHERE level == "ERROR" OR retry == true
+| STATS error_count = COUNT(*), avg_latency = AVG(latency_ms),
+        first_seen = MIN(@timestamp), last_seen = MAX(@timestamp)
+  BY error_type
+| SORT error_count DESC
+| LIMIT 10
+"""
+
+DEPLOYMENTS_QUERY = """
+FROM {deployments}
+| WHERE @timestamp > NOW() - TO_TIMEDURATION(?)
+| WHERE service == ? AND region == ?
+| SORT @timestamp DESC
+| KEEP @timestamp, deployment_id, version, status
+| LIMIT 10
+"""
+
+WASTE_QUERY = """
+FROM {waste}
+| WHERE @timestamp > NOW() - TO_TIMEDURATION(?)
+| WHERE service == ? AND region == ?
+| STATS retry_count = SUM(retry_count), wasted_cpu_seconds = SUM(wasted_cpu_seconds),
+        wasted_co2_grams = SUM(wasted_co2_grams)
+  BY error_type, deployment_id
+| SORT wasted_co2_grams DESC
+| LIMIT 10
+"""
+
+IMPACT_QUERY = """
+FROM {incidents}
+| WHERE @timestamp > NOW() - TO_TIMEDURATION(?)
+| WHERE service == ? AND region == ?
+| STATS incident_count = COUNT(*), total_orders_affected = SUM(orders_affected),
+        total_revenue_lost_usd = SUM(revenue_lost_usd),
+        total_wasted_emissions_kg_co2e = SUM(wasted_emissions_kg_co2e)
+"""
+
+
+def _round(value, digits: int = 2):
+    return round(value, digits) if isinstance(value, float) else value
+
+
+def summarize_spike(rows: list[dict]) -> dict:
+    """Peak 10-minute bucket vs the window average, instead of every bucket."""
+    rows = [r for r in rows if r.get("avg_co2") is not None]
+    if not rows:
+        return {"confirmed": False, "buckets": 0}
+    window_avg = sum(r["avg_co2"] for r in rows) / len(rows)
+    peak = max(rows, key=lambda r: r["avg_co2"])
+    peak_vs_avg = 100.0 * (peak["avg_co2"] - window_avg) / window_avg if window_avg else None
+    return {
+        # A peak bucket 20% above the window average counts as a spike.
+        "confirmed": peak_vs_avg is not None and peak_vs_avg >= 20.0,
+        "buckets": len(rows),
+        "window_avg_co2_grams": _round(window_avg),
+        "peak_bucket": peak["bucket_ts"],
+        "peak_avg_co2_grams": _round(peak["avg_co2"]),
+        "peak_vs_window_pct": _round(peak_vs_avg),
+        "peak_avg_cpu_pct": _round(peak.get("avg_cpu")),
+        "peak_avg_rps": _round(peak.get("avg_rps")),
+        "latest_avg_co2_grams": _round(rows[-1]["avg_co2"]),
+    }
+
+
+def summarize_errors(rows: list[dict]) -> dict:
+    return {
+        "total": sum(r.get("error_count") or 0 for r in rows),
+        "by_error_type": [{k: _round(v) for k, v in r.items()} for r in rows],
+    }
+
+
+def summarize_waste(rows: list[dict]) -> dict:
+    return {
+        "wasted_cpu_seconds": _round(sum(r.get("wasted_cpu_seconds") or 0.0 for r in rows)),
+        "wasted_co2_grams": _round(sum(r.get("wasted_co2_grams") or 0.0 for r in rows)),
+        "top": [{k: _round(v) for k, v in r.items()} for r in rows[:5]],
+    }
+
+
+def summarize_impact(rows: list[dict]) -> dict:
+    if not rows:
+        return {"incident_count": 0}
+    return {k: _round(v) for k, v in rows[0].items()}
+
+
+async def build_bundle(service: str, region: str, time_window: str = "24 hours") -> dict:
+    """Run the five investigation queries concurrently and return one compact payload."""
+    params = [time_window, service, region]
+    sections = {
+        "spike": (SPIKE_QUERY.format(metrics=index_name("spiketrace", "carbon-metrics-*")), summarize_spike),
+        "errors": (ERRORS_QUERY.format(logs=index_name("spiketrace", "logs-*")), summarize_errors),
+        "deployments": (DEPLOYMENTS_QUERY.format(deployments=index_name("spiketrace", "deployments-*")), list),
+        "waste": (WASTE_QUERY.format(waste=index_name("spiketrace", "waste-attribution")), summarize_waste),
+        "business_impact": (IMPACT_QUERY.format(incidents=index_name("spiketrace", "incidents")), summarize_impact),
+    }
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(run_esql_async(query, params) for query, _ in sections.values()), return_exceptions=True
+    )
+    bundle = {"service": service, "region": region, "time_window": time_window, "errors_by_section": {}}
+    for (name, (_, summarize)), result in zip(sections.items(), results):
+        # One missing index (e.g. waste attribution not populated yet) must not sink the rest.
+        if isinstance(result, Exception):
+            bundle[name] = None
+            bundle["errors_by_section"][name] = str(result)
+        else:
+            bundle[name] = summarize(result)
+    bundle["took_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return bundle
+
+
+def _window_key(time_window: str) -> str:
+    """ "24 hours", "24 hour" and "1 day" name the same window, so they share cache entries."""
+    match = _WINDOW_RE.match(time_window)
+    if not match:
+        return time_window.strip().lower()
+    return f"{int(match.group(1)) * _WINDOW_MINUTES[match.group(2).lower()]}m"
+
+
+def session_key(service: str, region: str, time_window: str) -> str:
+    """Key a bundle is cached under in a chat session's tool_results."""
+    return f"investigation_bundle:{service}|{region}|{_window_key(time_window)}"
+
+
+class BundleCache:
+    """
+    Short-lived cache of bundles keyed by (service, region, time_window), kept in SharedState.
+
+    In-flight builds are shared within a worker, so a prefetch started by
+    /api/chat and the agent's tool call moments later run the queries only once.
+    """
+
+    def __init__(self, state: SharedState, ttl_seconds: float = 60.0):
+        self.state = state
+        self.ttl_seconds = ttl_seconds
+        self.counters = Counters(state, "investigation_bundles", ("hits", "misses"))
+        self._in_flight: dict[str, asyncio.Task] = {}
+
+    async def _build(self, key: str, service: str, region: str, time_window: str) -> dict:
+        try:
+            bundle = await build_bundle(service, region, time_window)
+            await asyncio.to_thread(self.state.set, key, bundle, self.ttl_seconds)
+            return bundle
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def get(self, service: str, region: str, time_window: str) -> dict:
+        key = "bundle:" + session_key(service, region, time_window)
+        task = self._in_flight.get(key)
+        if task is None:
+            cached = await asyncio.to_thread(self.state.get, key)
+            if cached is not None:
+                await asyncio.to_thread(self.counters.incr, "hits")
+                return cached
+            # Another caller may have started the build while the lookup ran.
+            task = self._in_flight.get(key)
+            if task is None:
+                task = self._in_flight[key] = asyncio.create_task(self._build(key, service, region, time_window))
+                await asyncio.to_thread(self.counters.incr, "misses")
+        # shield() so a client disconnect does not cancel a build other callers share.
+        return await asyncio.shield(task)
+
+    def prefetch(self, service: str, region: str, time_window: str) -> asyncio.Task:
+        task = asyncio.create_task(self.get(service, region, time_window))
+        task.add_done_callback(_log_prefetch_failure)
+        return task
+
+    def stats(self) -> dict:
+        """Hit/miss counts summed across workers; blocks on SharedState, so call it in a thread."""
+        return {**self.counters.snapshot(), "in_flight": len(self._in_flight), "ttl_seconds": self.ttl_seconds}
+
+
+def _log_prefetch_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Investigation bundle prefetch failed", exc_info=task.exception())
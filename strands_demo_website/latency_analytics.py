@@ -0,0 +1,97 @@
+"""
+Fast p50/p95/p99 latency over any window by merging precomputed 5-minute
+DDSketches (written by scripts/latency_rollup.py) instead of computing exact
+percentiles over raw logs.
+
+Sketches cover whole buckets, so the window's start is rounded down to a bucket
+boundary: the partly covered first bucket is included in full rather than
+dropped, and a window reads up to one bucket more than it names.
+"""
+import asyncio
+from datetime import datetime, timezone
+
+from es_client import get_es_client, index_name  # also puts scripts/ on sys.path
+from seed_demo_data import window_to_timedelta
+from sketches import DDSketch
+
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+GROUP_FIELDS = ("service", "region")
+# Bucket size of the sketches written by scripts/latency_rollup.py (BUCKET_MINUTES there).
+SKETCH_BUCKET_MINUTES = 5
+
+
+def sketch_window_start(time_window: str) -> str:
+    """ISO start of the first sketch bucket the window touches (now - window, rounded down to a bucket)."""
+    start = datetime.now(timezone.utc) - window_to_timedelta(time_window)
+    start = start.replace(minute=start.minute - start.minute % SKETCH_BUCKET_MINUTES, second=0, microsecond=0)
+    return start.isoformat()
+
+
+def _fetch_and_merge(
+    time_window: str, service: str | None, region: str | None, group_by: tuple[str, ...]
+) -> dict[tuple, DDSketch]:
+    from elasticsearch import NotFoundError
+
+    filters = [
+        {"term": {"kind": "sketch"}},
+        {"range": {"@timestamp": {"gte": sketch_window_start(time_window)}}},
+    ]
+    if service:
+        filters.append({"term": {"service": service}})
+    if region:
+        filters.append({"term": {"region": region}})
+
+    es = get_es_client()
+    merged: dict[tuple, DDSketch] = {}
+    search_after = None
+    while True:
+        try:
+            resp = es.search(
+                index=index_name("spiketrace", "latency-sketches"),
+                query={"bool": {"filter": filters}},
+                source=["service", "region", "sketch"],
+                sort=[{"@timestamp": "asc"}, {"service": "asc"}, {"region": "asc"}],
+                size=5000,
+                search_after=search_after,
+            )
+        except NotFoundError:
+            # scripts/latency_rollup.py has not created the index yet.
+            return {}
+        hits = resp["hits"]["hits"]
+        if not hits:
+            break
+        for hit in hits:
+            src = hit["_source"]
+            key = tuple(src.get(f) for f in group_by)
+            sketch = DDSketch.from_dict(src["sketch"])
+            if key in merged:
+                merged[key].merge(sketch)
+            else:
+                merged[key] = sketch
+        search_after = hits[-1]["sort"]
+    return merged
+
+
+async def latency_percentiles(
+    time_window: str = "1 hour",
+    service: str | None = None,
+    region: str | None = None,
+    group_by: tuple[str, ...] = GROUP_FIELDS,
+    quantiles: tuple[float, ...] = DEFAULT_QUANTILES,
+) -> list[dict]:
+    """
+    Merged latency percentiles per group, e.g. [{"service", "region", "p50", "p95", "p99", "count"}].
+    The window starts at a 5-minute bucket boundary (see module docstring); no rows until the rollup has run.
+    """
+    bad = [f for f in group_by if f not in GROUP_FIELDS]
+    if bad:
+        raise ValueError(f"group_by must be a subset of {', '.join(GROUP_FIELDS)}")
+    merged = await asyncio.to_thread(_fetch_and_merge, time_window, service, region, tuple(group_by))
+    rows = []
+    for key, sketch in sorted(merged.items(), key=lambda kv: tuple(str(k) for k in kv[0])):
+        row = dict(zip(group_by, key))
+        row.update({k: round(v, 2) if v is not None else None for k, v in sketch.quantiles(quantiles).items()})
+        row["count"] = int(sketch.count)
+        row["mean"] = round(sketch.mean, 2) if sketch.mean is not None else None
+        rows.append(row)
+    return rows
@@ -0,0 +1,277 @@
+"""
+Log exploration beyond the 100-row `search_logs` tool.
+
+- `search_page`: cursor-paginated log search over a point-in-time (PIT) with
+  search_after, so a client can walk any number of matching lines page by page.
+- `top_patterns`: streams every matching line through a Drain-style template
+  miner and returns counts per message template ("Payment authorization failed
+  after <NUM> ms" x 41,203), so the agent gets the top error patterns over a
+  large window without raw lines.
+
+Memory stays bounded: pages are consumed one at a time and the miner keeps at
+most `max_clusters` templates, evicting the least recently matched. Evicted
+templates take their counts with them, so counts are only exact while
+`templates_evicted` is 0 (reported as `counts_exact`).
+"""
+import asyncio
+import base64
+import json
+import re
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+
+from es_client import get_es_client, index_name
+from seed_demo_data import window_to_datemath
+
+PIT_KEEP_ALIVE = "2m"
+MAX_PAGE_SIZE = 10000
+_SORT = [{"@timestamp": "asc"}, {"_shard_doc": "asc"}]
+_SOURCE = ["@timestamp", "service", "region", "level", "error_type", "message", "latency_ms", "deployment_id"]
+
+# Variable parts are masked before clustering so they never split templates.
+_MASKS = (
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<UUID>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<IP>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<HEX>"),
+    # "%" is matched instead of the closing \b: no word boundary follows "%" at a space or end of line.
+    (re.compile(r"\b\d+(?:\.\d+)?(?:%|(?:ms|s)?\b)"), "<NUM>"),
+)
+WILDCARD = "<*>"
+
+
+def _tokenize(message: str) -> list[str]:
+    for pattern, token in _MASKS:
+        message = pattern.sub(token, message)
+    return message.split()
+
+
+@dataclass
+class LogTemplate:
+    template_id: int
+    tokens: list[str]
+    count: int = 0
+    first_seen: str | None = None
+    last_seen: str | None = None
+    sample: str | None = None
+    error_types: Counter = field(default_factory=Counter)
+    group_key: tuple = ()
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+    def to_dict(self) -> dict:
+        return {
+            "template_id": self.template_id,
+            "template": self.template,
+            "count": self.count,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "sample": self.sample,
+            "error_types": dict(self.error_types.most_common(5)),
+        }
+
+
+class TemplateMiner:
+    """
+    Drain-style online clustering: messages are grouped by token count and
+    leading tokens, then matched to the most similar template in that group.
+    Positions where a match differs become `<*>`.
+    """
+
+    MAX_ERROR_TYPES = 20
+
+    def __init__(self, similarity: float = 0.5, prefix_depth: int = 2, max_clusters: int = 1000):
+        self.similarity = similarity
+        self.prefix_depth = prefix_depth
+        self.max_clusters = max_clusters
+        self._templates: OrderedDict[int, LogTemplate] = OrderedDict()
+        self._groups: dict[tuple, list[int]] = {}
+        self._next_id = 1
+        self.messages = 0
+        self.evicted = 0
+
+    def _group_key(self, tokens: list[str]) -> tuple:
+        prefix = tuple(t if not t.startswith("<") else WILDCARD for t in tokens[: self.prefix_depth])
+        return (len(tokens), prefix)
+
+    @staticmethod
+    def _score(template: list[str], tokens: list[str]) -> float:
+        same = sum(1 for a, b in zip(template, tokens) if a == b and a != WILDCARD)
+        return same / len(tokens) if tokens else 1.0
+
+    def add(self, message: str, error_type: str | None = None, ts: str | None = None) -> LogTemplate:
+        self.messages += 1
+        tokens = _tokenize(message or "")
+        key = self._group_key(tokens)
+        group = self._groups.setdefault(key, [])
+
+        best, best_score = None, -1.0
+        for template_id in group:
+            score = self._score(self._templates[template_id].tokens, tokens)
+            if score > best_score:
+                best, best_score = self._templates[template_id], score
+        if best is None or best_score < self.similarity:
+            best = LogTemplate(self._next_id, tokens, sample=message, first_seen=ts, group_key=key)
+            self._next_id += 1
+            self._templates[best.template_id] = best
+            group.append(best.template_id)
+            self._evict()
+        else:
+            best.tokens = [a if a == b else WILDCARD for a, b in zip(best.tokens, tokens)]
+            self._templates.move_to_end(best.template_id)
+
+        best.count += 1
+        best.last_seen = ts or best.last_seen
+        if error_type and (error_type in best.error_types or len(best.error_types) < self.MAX_ERROR_TYPES):
+            best.error_types[error_type] += 1
+        return best
+
+    def _evict(self) -> None:
+        while len(self._templates) > self.max_clusters:
+            template_id, template = self._templates.popitem(last=False)
+            self._groups[template.group_key].remove(template_id)
+            self.evicted += 1
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def top(self, n: int = 20) -> list[dict]:
+        return [t.to_dict() for t in sorted(self._templates.values(), key=lambda t: t.count, reverse=True)[:n]]
+
+
+def build_log_query(
+    service: str | None, region: str | None, time_window: str, level: str | None = None, text: str | None = None
+) -> dict:
+    filters = [{"range": {"@timestamp": {"gte": window_to_datemath(time_window)}}}]
+    for name, value in (("service", service), ("region", region), ("level", level)):
+        if value:
+            filters.append({"term": {name: value}})
+    must = [{"match": {"message": {"query": text, "operator": "and"}}}] if text else []
+    return {"bool": {"filter": filters, "must": must}}
+
+
+def _encode_cursor(pit_id: str, search_after: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"pit": pit_id, "after": search_after}).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[str, list]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return data["pit"], data["after"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def _search_page_sync(query: dict, size: int, cursor: str | None) -> dict:
+    from elasticsearch import NotFoundError
+
+    es = get_es_client()
+    if cursor:
+        pit_id, search_after = _decode_cursor(cursor)
+    else:
+        pit_id = es.open_point_in_time(index=index_name("spiketrace", "logs-*"), keep_alive=PIT_KEEP_ALIVE)["id"]
+        search_after = None
+    try:
+        resp = es.search(
+            pit={"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+            query=query,
+            sort=_SORT,
+            size=size,
+            search_after=search_after,
+            source=_SOURCE,
+            track_total_hits=cursor is None,
+        )
+    except NotFoundError:
+        # The cursor's PIT outlived PIT_KEEP_ALIVE between pages (or never existed).
+        if cursor:
+            raise ValueError("Cursor expired; restart the search")
+        raise
+    hits = resp["hits"]["hits"]
+    # The PIT id can change between requests; always continue with the latest one.
+    pit_id = resp.get("pit_id", pit_id)
+    next_cursor = None
+    if len(hits) == size:
+        next_cursor = _encode_cursor(pit_id, hits[-1]["sort"])
+    else:
+        es.close_point_in_time(id=pit_id)
+    result = {"logs": [h["_source"] for h in hits], "next_cursor": next_cursor}
+    if cursor is None:
+        result["total"] = resp["hits"]["total"]["value"]
+    return result
+
+
+async def search_page(
+    service: str | None = None,
+    region: str | None = None,
+    time_window: str = "1 hour",
+    level: str | None = None,
+    text: str | None = None,
+    size: int = 100,
+    cursor: str | None = None,
+) -> dict:
+    """One page of matching log lines; pass `next_cursor` back to continue where the last page ended."""
+    size = max(1, min(size, MAX_PAGE_SIZE))
+    query = build_log_query(service, region, time_window, level, text)
+    return await asyncio.to_thread(_search_page_sync, query, size, cursor)
+
+
+def iter_logs(query: dict, page_size: int = 5000, max_docs: int | None = None):
+    """Yield `_source` of every matching log line over a PIT, one page in memory at a time."""
+    es = get_es_client()
+    pit_id = es.open_point_in_time(index=index_name("spiketrace", "logs-*"), keep_alive=PIT_KEEP_ALIVE)["id"]
+    search_after = None
+    seen = 0
+    try:
+        while max_docs is None or seen < max_docs:
+            size = page_size if max_docs is None else min(page_size, max_docs - seen)
+            resp = es.search(
+                pit={"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+                query=query,
+                sort=_SORT,
+                size=size,
+                search_after=search_after,
+                source=["@timestamp", "error_type", "message"],
+                track_total_hits=False,
+            )
+            pit_id = resp.get("pit_id", pit_id)
+            hits = resp["hits"]["hits"]
+            for hit in hits:
+                yield hit["_source"]
+            seen += len(hits)
+            if len(hits) < size:
+                break
+            search_after = hits[-1]["sort"]
+    finally:
+        es.close_point_in_time(id=pit_id)
+
+
+def _top_patterns_sync(query: dict, max_docs: int, top: int, max_clusters: int) -> dict:
+    miner = TemplateMiner(max_clusters=max_clusters)
+    for src in iter_logs(query, max_docs=max_docs):
+        miner.add(src.get("message"), src.get("error_type"), src.get("@timestamp"))
+    return {
+        "scanned": miner.messages,
+        "truncated": miner.messages >= max_docs,
+        "templates_tracked": len(miner),
+        "templates_evicted": miner.evicted,
+        # An evicted template's count is lost, so once anything was evicted counts are lower bounds.
+        "counts_exact": miner.evicted == 0,
+        "patterns": miner.top(top),
+    }
+
+
+async def top_patterns(
+    service: str | None = None,
+    region: str | None = None,
+    time_window: str = "1 hour",
+    level: str | None = "ERROR",
+    text: str | None = None,
+    max_docs: int = 1_000_000,
+    top: int = 20,
+    max_clusters: int = 1000,
+) -> dict:
+    """Most frequent message templates among matching log lines, with counts and a sample each."""
+    query = build_log_query(service, region, time_window, level, text)
+    result = await asyncio.to_thread(_top_patterns_sync, query, max_docs, top, max_clusters)
+    return {"service": service, "region": region, "time_window": time_window, "level": level, **result}
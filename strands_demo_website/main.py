@@ -1,16 +1,93 @@
 """
 FastAPI backend for SpikeTrace chat: exposes /api/chat and serves the frontend.
 """
+import asyncio
+import logging
 import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
-from strands_spiketrace_agent import query_spiketrace_agent
+from baselines import BaselineProfiles
+from incident_dispatch import IncidentDispatcher, IncidentRequest
+from investigation_bundle import BundleCache, session_key
+from latency_analytics import latency_percentiles
+from log_explorer import search_page, top_patterns
+from region_compare import compare_regions
+from scheduling import scheduling_recommendations
+from session_store import SessionStore, resolve_investigation_context
+from settings import load_settings
+from shared_state import Counters, RateLimiter, SharedState
+from static_assets import PrecompressedStaticFiles
+from strands_spiketrace_agent import query_spiketrace_agent, warm_up
 
-app = FastAPI(title="SpikeTrace Chat API")
+logger = logging.getLogger(__name__)
+
+sessions = SessionStore.from_env()
+shared_state = SharedState.from_env()
+chat_rate_limiter = RateLimiter(
+    shared_state, limit=int(os.getenv("SPIKETRACE_CHAT_RATE_LIMIT_PER_MINUTE", "0"))
+)
+chat_metrics = Counters(
+    shared_state, "chat", ("completed", "failed", "client_disconnected", "deadline_exceeded", "upstream_cancelled", "upstream_cancel_failed")
+)
+baseline_profiles = BaselineProfiles()
+investigation_bundles = BundleCache(shared_state, ttl_seconds=float(os.getenv("SPIKETRACE_BUNDLE_TTL_SECONDS", "60")))
+# How long a bundle cached in a chat session is reused for follow-up questions.
+session_tool_result_max_age = float(os.getenv("SPIKETRACE_SESSION_TOOL_RESULT_MAX_AGE_SECONDS", "900"))
+incident_dispatcher = IncidentDispatcher.from_env(
+    shared_state, default_base_url=os.getenv("SPIKETRACE_PUBLIC_BASE_URL", "http://127.0.0.1:8000")
+)
+
+
+async def _run_every(seconds: float, fn) -> None:
+    """Run a blocking housekeeping call in a thread every `seconds` until cancelled."""
+    while True:
+        await asyncio.sleep(seconds)
+        try:
+            await asyncio.to_thread(fn)
+        except Exception:
+            logger.exception("Housekeeping call %s failed", getattr(fn, "__qualname__", fn))
+
+
+def _log_warm_up_failure(task: asyncio.Task) -> None:
+    # Retrieving the exception here also keeps asyncio from reporting it as never retrieved.
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("A2A client warm-up failed; the first chat request will load it", exc_info=task.exception())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fail fast on missing agent configuration instead of on the first chat request.
+    load_settings()
+    # Load the A2A client stack in the background; startup does not wait for it.
+    app.state.warm_up = asyncio.create_task(asyncio.to_thread(warm_up))
+    app.state.warm_up.add_done_callback(_log_warm_up_failure)
+    # Expired sessions (and SQLite rows beyond max_entries) are otherwise never removed.
+    # Expired rate-limit windows and cache keys stay in the SQLite backend until purged.
+    housekeeping = [
+        asyncio.create_task(_run_every(float(os.getenv("SPIKETRACE_SESSION_PRUNE_SECONDS", "300")), sessions.prune)),
+        asyncio.create_task(
+            _run_every(float(os.getenv("SPIKETRACE_SHARED_STATE_PURGE_SECONDS", "300")), shared_state.purge_expired)
+        ),
+    ]
+    await incident_dispatcher.start()
+    try:
+        yield
+    finally:
+        for task in housekeeping:
+            task.cancel()
+        await asyncio.gather(*housekeeping, return_exceptions=True)
+        await incident_dispatcher.stop()
+
+
+app = FastAPI(title="SpikeTrace Chat API", lifespan=lifespan)
 
 # Allow frontend (same-origin when served from here, or localhost from file/server)
 app.add_middleware(
@@ -20,8 +97,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Compresses API responses and any asset without a pre-compressed sibling;
+# responses that already carry Content-Encoding pass through untouched.
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 frontend_path = os.path.join(os.path.dirname(__file__), "frontend")
+# Output of scripts/build_frontend.py (fingerprinted + pre-compressed), preferred when present.
+frontend_dist_path = os.path.join(os.path.dirname(__file__), "frontend_dist")
 
 
 class ChatRequest(BaseModel):
@@ -34,26 +116,292 @@ class ChatResponse(BaseModel):
     context_id: str | None = None  # Send this back on the next message in this chat
 
 
+class IncidentCreateRequest(BaseModel):
+    summary: str
+    description: str = ""
+    service: str = ""
+    region: str = ""
+    deployment_id: str = ""
+    severity: str = "high"
+    issue_type: str = "10054"
+
+
+def _with_implied_context(message: str, context: dict, context_id: str | None = None) -> str:
+    """
+    Prefix service/region/window the user resolved earlier but did not repeat in this message,
+    plus the context_id the agent passes to investigation_bundle so the backend can reuse its cache.
+    """
+    explicit = resolve_investigation_context(message)
+    implied = {k: v for k, v in context.items() if k not in explicit}
+    if context_id:
+        implied["context_id"] = context_id
+    if not implied:
+        return message
+    hint = ", ".join(f"{k}={v}" for k, v in sorted(implied.items()))
+    return f"[Context from earlier in this conversation: {hint}]\n{message}"
+
+
+def _deadline_budget(http_request: Request) -> float:
+    """Seconds this chat call may take: the client's X-Deadline-Ms, capped by SPIKETRACE_CHAT_DEADLINE_SECONDS."""
+    budget = load_settings().deadline_seconds
+    header = http_request.headers.get("x-deadline-ms")
+    if header:
+        try:
+            budget = min(budget, max(0.0, float(header) / 1000.0))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="X-Deadline-Ms must be a number of milliseconds")
+    return budget
+
+
+async def _count(outcome: str) -> None:
+    await asyncio.to_thread(chat_metrics.incr, outcome)
+
+
+async def _wait_for_disconnect(http_request: Request) -> None:
+    while not await http_request.is_disconnected():
+        await asyncio.sleep(0.5)
+
+
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     """Send user message to SpikeTrace agent and return the response. Pass context_id to keep conversation context (e.g. so 'yes' triggers create_incident_ticket)."""
     message = (request.message or "").strip()
     if not message:
         raise HTTPException(status_code=400, detail="Message cannot be empty")
-    try:
-        response_text, context_id = await query_spiketrace_agent(
-            message, context_id=request.context_id
+    client_host = http_request.client.host if http_request.client else "unknown"
+    # Session and shared-state calls may block on SQLite, so they run in threads.
+    if not await asyncio.to_thread(chat_rate_limiter.allow, client_host):
+        raise HTTPException(status_code=429, detail="Too many chat requests; try again shortly")
+    session = await asyncio.to_thread(sessions.get, request.context_id)
+    context = resolve_investigation_context(message, session["context"] if session else None)
+    prefetch = None
+    if context.get("service") and context.get("region"):
+        # Pin the window and tell the agent (via the context hint) so its bundle call hits the prefetched key.
+        context.setdefault("time_window", "24 hours")
+        # Warm the investigation bundle while the agent is still planning its first tool call,
+        # unless this conversation already holds a fresh one for the same service/region/window.
+        key = session_key(context["service"], context["region"], context["time_window"])
+        cached = await asyncio.to_thread(
+            sessions.cached_tool_result, request.context_id, key, session_tool_result_max_age
+        )
+        if cached is None:
+            prefetch = investigation_bundles.prefetch(context["service"], context["region"], context["time_window"])
+    agent_message = _with_implied_context(message, context, request.context_id)
+
+    budget = _deadline_budget(http_request)
+    deadline = time.monotonic() + budget
+    agent_call = asyncio.create_task(
+        query_spiketrace_agent(
+            agent_message,
+            context_id=request.context_id,
+            deadline=deadline,
+            on_upstream_cancel=lambda ok: _count("upstream_cancelled" if ok else "upstream_cancel_failed"),
         )
-        return ChatResponse(response=response_text, context_id=context_id)
+    )
+    disconnected = asyncio.create_task(_wait_for_disconnect(http_request))
+    done, _ = await asyncio.wait({agent_call, disconnected}, timeout=budget, return_when=asyncio.FIRST_COMPLETED)
+    disconnected.cancel()
+    if agent_call not in done:
+        # Cancelling the call also cancels the upstream A2A task; wait so that finishes first.
+        agent_call.cancel()
+        await asyncio.gather(agent_call, return_exceptions=True)
+        if disconnected in done:
+            await _count("client_disconnected")
+            raise HTTPException(status_code=499, detail="Client disconnected")
+        await _count("deadline_exceeded")
+        raise HTTPException(status_code=504, detail=f"Agent did not answer within {budget:.1f}s")
+
+    try:
+        response_text, context_id = agent_call.result()
     except Exception as e:
+        # The HTTP timeouts are capped at the remaining budget, so a late failure is a deadline miss.
+        if time.monotonic() >= deadline:
+            await _count("deadline_exceeded")
+            raise HTTPException(status_code=504, detail=f"Agent did not answer within {budget:.1f}s")
+        await _count("failed")
         raise HTTPException(
             status_code=500,
             detail=f"Agent error: {str(e)}",
         )
+    await _count("completed")
+    if context_id:
+        await asyncio.to_thread(sessions.record_turn, context_id, message, response_text, context)
+        if prefetch is not None and prefetch.done() and not prefetch.cancelled() and prefetch.exception() is None:
+            # Follow-ups reuse it for session_tool_result_max_age instead of prefetching again once the cache TTL lapses.
+            await asyncio.to_thread(sessions.cache_tool_result, context_id, key, prefetch.result())
+    return ChatResponse(response=response_text, context_id=context_id)
+
+
+@app.get("/api/metrics")
+async def metrics():
+    """Chat outcome counters (summed across workers) plus dispatch and bundle cache stats."""
+    return {
+        "chat": await asyncio.to_thread(chat_metrics.snapshot),
+        "incident_dispatch": incident_dispatcher.describe(),
+        "investigation_bundles": await asyncio.to_thread(investigation_bundles.stats),
+    }
+
+
+@app.get("/api/health")
+async def health():
+    """Liveness probe; reports the serving worker's pid so multi-worker balancing is visible."""
+    return {"status": "ok", "pid": os.getpid()}
+
+
+@app.post("/api/incidents", status_code=202)
+async def create_incident(request: IncidentCreateRequest):
+    """
+    Queue a Jira incident + Slack notification; duplicates within the same time bucket are dropped.
+
+    Pass service/region (and deployment_id) so unrelated incidents are not merged; without
+    them only incidents with the same summary count as duplicates.
+    """
+    if not request.summary.strip():
+        raise HTTPException(status_code=400, detail="Summary cannot be empty")
+    return await incident_dispatcher.submit(IncidentRequest(**request.model_dump()))
+
+
+@app.get("/api/incidents/dispatch")
+async def incident_dispatch_stats():
+    return incident_dispatcher.describe()
+
+
+@app.get("/api/regions/compare")
+async def regions_compare(
+    time_window: str = "24 hours",
+    baseline_window: str = "7 days",
+    regions: str | None = None,
+    service: str | None = None,
+    strategy: str = "single",
+):
+    """Recent vs baseline emissions for every region (or a comma-separated subset) in one response."""
+    region_list = [r.strip() for r in regions.split(",") if r.strip()] if regions else None
+    try:
+        return await compare_regions(time_window, baseline_window, region_list, service, strategy)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/baselines/score")
+async def baselines_score(service: str, region: str, metric: str, value: float, timestamp: datetime | None = None):
+    """Score one point against its hour-of-week baseline (robust z-score and percentile band)."""
+    try:
+        return await baseline_profiles.score(service, region, metric, value, timestamp)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/baselines/{service}/{region}")
+async def baselines_week(service: str, region: str):
+    """Hour-of-week percentile profile for a service/region."""
+    return {"service": service, "region": region, "hours": await baseline_profiles.week_profile(service, region)}
+
+
+@app.get("/api/latency/percentiles")
+async def latency_percentiles_endpoint(
+    time_window: str = "1 hour",
+    service: str | None = None,
+    region: str | None = None,
+    group_by: str = "service,region",
+):
+    """p50/p95/p99 latency over the window from merged 5-minute sketches (group_by may be empty for one row)."""
+    fields = tuple(f.strip() for f in group_by.split(",") if f.strip())
+    try:
+        return {"time_window": time_window, "rows": await latency_percentiles(time_window, service, region, fields)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/investigations/bundle")
+async def investigation_bundle(service: str, region: str, time_window: str = "24 hours", context_id: str | None = None):
+    """
+    Spike, errors, deployments, waste and business impact for one service/region in a single call.
+
+    With context_id, a bundle fetched earlier in the same conversation is reused for follow-ups.
+    """
+    key = session_key(service, region, time_window)
+    cached = await asyncio.to_thread(sessions.cached_tool_result, context_id, key, session_tool_result_max_age)
+    if cached is not None:
+        return cached
+    bundle = await investigation_bundles.get(service, region, time_window)
+    if context_id:
+        await asyncio.to_thread(sessions.cache_tool_result, context_id, key, bundle)
+    return bundle
+
+
+@app.get("/api/investigations/bundle/stats")
+async def investigation_bundle_stats():
+    return await asyncio.to_thread(investigation_bundles.stats)
+
+
+@app.get("/api/logs/search")
+async def logs_search(
+    time_window: str = "1 hour",
+    service: str | None = None,
+    region: str | None = None,
+    level: str | None = None,
+    q: str | None = None,
+    size: int = 100,
+    cursor: str | None = None,
+):
+    """Paginated log search (PIT + search_after); pass next_cursor back for the next page."""
+    try:
+        return await search_page(service, region, time_window, level, q, size, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/logs/patterns")
+async def logs_patterns(
+    time_window: str = "1 hour",
+    service: str | None = None,
+    region: str | None = None,
+    level: str | None = "ERROR",
+    q: str | None = None,
+    max_docs: int = Query(1_000_000, ge=1, le=1_000_000),
+    top: int = Query(20, ge=1, le=200),
+):
+    """Top message templates (Drain-style clustering) with counts over every matching log line."""
+    try:
+        return await top_patterns(service, region, time_window, level or None, q, max_docs, top)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/scheduling/recommendations")
+async def scheduling_recommendations_endpoint(
+    time_window: str = "7 days",
+    service: str | None = None,
+    deferrable_share: float = 0.3,
+    max_util_pct: float = 80.0,
+    top: int = Query(20, ge=0),
+):
+    """Where/when to move deferrable load (cleaner region or hour) and the CO2 it would save per day."""
+    try:
+        return await scheduling_recommendations(time_window, service, deferrable_share, max_util_pct, top)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/sessions/{context_id}")
+async def get_session(context_id: str):
+    """Return the cached investigation context and recent turns for a conversation."""
+    session = await asyncio.to_thread(sessions.get, context_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired context_id")
+    return session
+
+
+if os.getenv("SPIKETRACE_MOCK_INTEGRATIONS") == "1":
+    from mock_integrations import router as mock_router
+
+    app.include_router(mock_router)
 
 
 # Serve frontend (must be last so /api/* takes precedence)
-if os.path.isdir(frontend_path):
+if os.path.isdir(frontend_dist_path):
+    app.mount("/", PrecompressedStaticFiles(directory=frontend_dist_path, html=True), name="frontend")
+elif os.path.isdir(frontend_path):
     app.mount("/", StaticFiles(directory=frontend_path, html=True), name="frontend")
 
 
@@ -0,0 +1,51 @@
+"""
+Local mock Jira and Slack endpoints for exercising the incident dispatch queue.
+
+Mounted by main.py when SPIKETRACE_MOCK_INTEGRATIONS=1. Received payloads are
+kept in memory and can be inspected via GET. Setting SPIKETRACE_MOCK_FAIL_RATE
+(0..1) makes a fraction of calls return 503 to exercise retry and backoff.
+"""
+import itertools
+import os
+import random
+
+from fastapi import APIRouter, HTTPException
+
+router = APIRouter(prefix="/mock", tags=["mock-integrations"])
+
+_issue_ids = itertools.count(1)
+jira_issues: list[dict] = []
+slack_messages: list[dict] = []
+
+
+def _maybe_fail() -> None:
+    if random.random() < float(os.getenv("SPIKETRACE_MOCK_FAIL_RATE", "0")):
+        raise HTTPException(status_code=503, detail="Injected mock failure")
+
+
+@router.post("/jira/rest/api/2/issue", status_code=201)
+async def create_jira_issue(payload: dict):
+    """Mimics Jira's create-issue response shape: {id, key, self}."""
+    _maybe_fail()
+    issue_id = next(_issue_ids)
+    key = f"DEMO-{issue_id}"
+    jira_issues.append({"id": str(issue_id), "key": key, **payload})
+    return {"id": str(issue_id), "key": key, "self": f"/mock/jira/rest/api/2/issue/{issue_id}"}
+
+
+@router.get("/jira/issues")
+async def list_jira_issues():
+    return jira_issues
+
+
+@router.post("/slack/webhook")
+async def post_slack_message(payload: dict):
+    """Mimics an incoming-webhook: accepts {text} and returns ok."""
+    _maybe_fail()
+    slack_messages.append(payload)
+    return {"ok": True}
+
+
+@router.get("/slack/messages")
+async def list_slack_messages():
+    return slack_messages
@@ -0,0 +1,125 @@
+"""
+Cross-region carbon comparison in a single response.
+
+For each region, compares the recent window (e.g. last 24 hours) against the
+region's own baseline (the rest of a longer window, e.g. the previous 7 days)
+and returns normalized deviation, so regions with very different absolute
+emissions - because of grid intensity or fleet size - can be ranked side by side.
+
+Two strategies:
+  - "single": one ES|QL query with `region IN (...)`, grouped by region
+  - "fanout": one ES|QL query per region, run concurrently
+"""
+import asyncio
+import re
+
+from es_client import index_name, run_esql_async  # also puts scripts/ on sys.path
+from carbon_utils import GRID_INTENSITY_G_PER_KWH, _grid_intensity_for_region
+
+_REGION_SAFE_RE = re.compile(r"^[a-z0-9-]+$")
+
+# Recent vs baseline split is done with EVAL + CASE so one pass produces both.
+COMPARE_QUERY = """
+FROM {metrics}
+| WHERE @timestamp > NOW() - TO_TIMEDURATION(?)
+| WHERE {region_filter}{service_filter}
+| EVAL is_recent = @timestamp > NOW() - TO_TIMEDURATION(?)
+| EVAL recent_co2 = CASE(is_recent, estimated_co2_grams, null),
+       baseline_co2 = CASE(is_recent, null, estimated_co2_grams),
+       recent_cpu = CASE(is_recent, cpu_pct, null),
+       baseline_cpu = CASE(is_recent, null, cpu_pct),
+       recent_rps = CASE(is_recent, requests_per_min, null),
+       baseline_rps = CASE(is_recent, null, requests_per_min)
+| STATS recent_avg_co2 = AVG(recent_co2), baseline_avg_co2 = AVG(baseline_co2),
+        recent_total_co2 = SUM(recent_co2),
+        recent_avg_cpu = AVG(recent_cpu), baseline_avg_cpu = AVG(baseline_cpu),
+        recent_avg_rps = AVG(recent_rps), baseline_avg_rps = AVG(baseline_rps)
+  BY region
+| LIMIT 1000
+"""
+
+
+def _validate_regions(regions: list[str] | None) -> list[str]:
+    regions = regions or sorted(GRID_INTENSITY_G_PER_KWH)
+    bad = [r for r in regions if not _REGION_SAFE_RE.match(r)]
+    if bad:
+        raise ValueError(f"Invalid region name(s): {', '.join(bad)}")
+    return regions
+
+
+def _build_query(regions: list[str], service: str | None) -> tuple[str, list]:
+    # Region names are validated above, so inlining them as literals is safe;
+    # ES|QL positional params cannot bind a list.
+    region_list = ", ".join(f'"{r}"' for r in regions)
+    region_filter = f'region == "{regions[0]}"' if len(regions) == 1 else f"region IN ({region_list})"
+    query = COMPARE_QUERY.format(
+        metrics=index_name("spiketrace", "carbon-metrics-*"),
+        region_filter=region_filter,
+        service_filter=" AND service == ?" if service else "",
+    )
+    return query, [service] if service else []
+
+
+def _deviation_pct(recent: float | None, baseline: float | None) -> float | None:
+    if recent is None or not baseline:
+        return None
+    return round(100.0 * (recent - baseline) / baseline, 2)
+
+
+def _summarize(row: dict) -> dict:
+    region = row["region"]
+    return {
+        "region": region,
+        "grid_intensity_g_per_kwh": _grid_intensity_for_region(region),
+        "recent_avg_co2_grams": row.get("recent_avg_co2"),
+        "baseline_avg_co2_grams": row.get("baseline_avg_co2"),
+        "recent_total_co2_kg": (row.get("recent_total_co2") or 0.0) / 1000.0,
+        "co2_deviation_pct": _deviation_pct(row.get("recent_avg_co2"), row.get("baseline_avg_co2")),
+        "cpu_deviation_pct": _deviation_pct(row.get("recent_avg_cpu"), row.get("baseline_avg_cpu")),
+        "rps_deviation_pct": _deviation_pct(row.get("recent_avg_rps"), row.get("baseline_avg_rps")),
+    }
+
+
+async def compare_regions(
+    time_window: str = "24 hours",
+    baseline_window: str = "7 days",
+    regions: list[str] | None = None,
+    service: str | None = None,
+    strategy: str = "single",
+) -> dict:
+    """
+    Compare recent vs baseline emissions across regions; results are sorted by
+    co2_deviation_pct, largest first. Regions with no data are listed in `missing`.
+    """
+    regions = _validate_regions(regions)
+
+    if strategy == "fanout":
+        results = await asyncio.gather(
+            *(run_esql_async(*_with_windows(_build_query([r], service), baseline_window, time_window)) for r in regions)
+        )
+        rows = [row for result in results for row in result]
+    elif strategy == "single":
+        rows = await run_esql_async(*_with_windows(_build_query(regions, service), baseline_window, time_window))
+    else:
+        raise ValueError("strategy must be 'single' or 'fanout'")
+
+    summaries = sorted(
+        (_summarize(r) for r in rows),
+        key=lambda s: s["co2_deviation_pct"] if s["co2_deviation_pct"] is not None else float("-inf"),
+        reverse=True,
+    )
+    seen = {s["region"] for s in summaries}
+    return {
+        "time_window": time_window,
+        "baseline_window": baseline_window,
+        "service": service,
+        "strategy": strategy,
+        "regions": summaries,
+        "missing": [r for r in regions if r not in seen],
+    }
+
+
+def _with_windows(query_and_params: tuple[str, list], baseline_window: str, time_window: str) -> tuple[str, list]:
+    # Positional params appear in query order: outer window, service (optional), recent window.
+    query, extra = query_and_params
+    return query, [baseline_window, *extra, time_window]
@@ -0,0 +1,33 @@
+"""
+Carbon-aware scheduling recommendations for the agent's remediation step.
+
+Loads per-(service, region, hour) CPU profiles from carbon metrics and runs the
+greedy placement in scripts/carbon_scheduler.py, which says how much deferrable
+load to move to which cleaner region/hour and how much CO2 that saves per day.
+"""
+import asyncio
+
+from es_client import get_es_client, index_name  # also puts scripts/ on sys.path
+from carbon_scheduler import DEFAULT_DEFERRABLE_SHARE, DEFAULT_MAX_UTIL_PCT, load_profiles, recommend_moves
+from seed_demo_data import window_to_datemath
+
+
+def _load_and_solve(
+    time_window: str, service: str | None, deferrable_share: float, max_util_pct: float, top: int
+) -> dict:
+    profiles = load_profiles(get_es_client(), index_name("spiketrace", "carbon-metrics-*"), time_window, service)
+    return recommend_moves(profiles, deferrable_share, max_util_pct, top)
+
+
+async def scheduling_recommendations(
+    time_window: str = "7 days",
+    service: str | None = None,
+    deferrable_share: float = DEFAULT_DEFERRABLE_SHARE,
+    max_util_pct: float = DEFAULT_MAX_UTIL_PCT,
+    top: int = 20,
+) -> dict:
+    """Top CO2-saving moves of deferrable load plus fleet totals; raises ValueError on bad arguments."""
+    window_to_datemath(time_window)  # validate before touching ES
+    result = await asyncio.to_thread(_load_and_solve, time_window, service, deferrable_share, max_util_pct, top)
+    result["time_window"] = time_window
+    return result
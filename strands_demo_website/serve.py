@@ -0,0 +1,69 @@
+"""
+Production entry point for the SpikeTrace chat backend with multiple workers.
+
+  python serve.py --workers 4                    # uvicorn process manager
+  python serve.py --workers 4 --server gunicorn  # gunicorn + UvicornWorker
+
+With more than one worker, sessions, caches and rate-limit counters must not
+live in per-process dicts. Unless already configured, this points them at a
+shared SQLite file (memory-mapped, WAL) next to the app, or at Redis when
+SPIKETRACE_REDIS_URL is set (see shared_state.py).
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def configure_shared_state(workers: int) -> None:
+    """Set env defaults so every worker process shares one state store."""
+    os.environ.setdefault("SPIKETRACE_WORKERS", str(workers))
+    if workers <= 1:
+        return
+    state_dir = os.getenv("SPIKETRACE_STATE_DIR", tempfile.gettempdir())
+    if not os.getenv("SPIKETRACE_REDIS_URL"):
+        os.environ.setdefault(
+            "SPIKETRACE_SHARED_STATE_PATH", os.path.join(state_dir, "spiketrace-shared-state.db")
+        )
+    os.environ.setdefault(
+        "SPIKETRACE_SESSION_SQLITE_PATH", os.path.join(state_dir, "spiketrace-sessions.db")
+    )
+    # Per-worker LRU copies would go stale as other workers update a session.
+    os.environ.setdefault("SPIKETRACE_SESSION_LOCAL_CACHE", "0")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run the SpikeTrace chat backend.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--server", choices=["uvicorn", "gunicorn"], default="uvicorn")
+    args = parser.parse_args(argv)
+
+    configure_shared_state(args.workers)
+
+    if args.server == "gunicorn":
+        # Replace this process so gunicorn owns signals and worker supervision.
+        os.chdir(APP_DIR)
+        os.execvp(
+            "gunicorn",
+            [
+                "gunicorn",
+                "main:app",
+                "--worker-class", "uvicorn.workers.UvicornWorker",
+                "--workers", str(args.workers),
+                "--bind", f"{args.host}:{args.port}",
+            ],
+        )
+
+    import uvicorn
+
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers, app_dir=APP_DIR)
+
+
+if __name__ == "__main__":
+    main()
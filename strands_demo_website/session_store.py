@@ -0,0 +1,225 @@
+"""
+Bounded chat session store keyed by A2A context_id.
+
+Keeps the investigation context a conversation has resolved so far (service,
+region, time window), recent turns and cached tool outputs, so follow-up
+questions can reuse them instead of re-running ES|QL. Entries are evicted by
+LRU order, TTL, an entry-count cap and an approximate memory cap. An optional
+SQLite file makes sessions survive restarts and be shared between processes;
+with several workers, disable the local cache so every read goes to SQLite.
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+KNOWN_SERVICES = ("checkout", "payments", "inventory")
+_REGION_RE = re.compile(r"\b([a-z]+-[a-z]+\d)\b")
+_WINDOW_RE = re.compile(r"\b(?:last|past)\s+(\d+)\s*(minute|hour|day|week)s?\b", re.IGNORECASE)
+MAX_TURNS = 10
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_investigation_context(message: str, previous: dict | None = None) -> dict:
+    """
+    Pull service, region and time window out of a question, falling back to what
+    the conversation resolved earlier so "and what about payments?" keeps the region.
+    """
+    context = dict(previous or {})
+    lowered = message.lower()
+    for service in KNOWN_SERVICES:
+        if service in lowered:
+            context["service"] = service
+            break
+    region = _REGION_RE.search(lowered)
+    if region:
+        context["region"] = region.group(1)
+    window = _WINDOW_RE.search(lowered)
+    if window:
+        context["time_window"] = f"{window.group(1)} {window.group(2).lower()}s"
+    elif "yesterday" in lowered:
+        context["time_window"] = "48 hours"
+    elif "today" in lowered:
+        context["time_window"] = "24 hours"
+    return context
+
+
+def _approx_size(session: dict) -> int:
+    return len(json.dumps(session, default=str))
+
+
+class SessionStore:
+    """
+    LRU + TTL session cache with optional SQLite write-through.
+
+    Sessions are plain JSON-serialisable dicts:
+      {"context": {...}, "turns": [...], "tool_results": {...}, "updated_at": float}
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: float = 3600.0,
+        max_bytes: int = 32 * 1024 * 1024,
+        sqlite_path: str | None = None,
+        local_cache: bool = True,
+    ):
+        if not local_cache and not sqlite_path:
+            raise ValueError("local_cache=False requires sqlite_path")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.local_cache = local_cache
+        self._sessions: OrderedDict[str, dict] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA mmap_size=67108864")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(context_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    @classmethod
+    def from_env(cls) -> "SessionStore":
+        return cls(
+            max_entries=int(os.getenv("SPIKETRACE_SESSION_MAX_ENTRIES", "1000")),
+            ttl_seconds=float(os.getenv("SPIKETRACE_SESSION_TTL_SECONDS", "3600")),
+            max_bytes=int(os.getenv("SPIKETRACE_SESSION_MAX_BYTES", str(32 * 1024 * 1024))),
+            sqlite_path=os.getenv("SPIKETRACE_SESSION_SQLITE_PATH") or None,
+            local_cache=os.getenv("SPIKETRACE_SESSION_LOCAL_CACHE", "1") != "0",
+        )
+
+    def _expired(self, session: dict, now: float) -> bool:
+        return now - session.get("updated_at", 0.0) > self.ttl_seconds
+
+    def _drop(self, context_id: str) -> None:
+        self._sessions.pop(context_id, None)
+        self._bytes -= self._sizes.pop(context_id, 0)
+
+    def _evict(self, now: float) -> None:
+        # Expired entries first, then least recently used until under both caps.
+        for context_id in [cid for cid, s in self._sessions.items() if self._expired(s, now)]:
+            self._drop(context_id)
+        while self._sessions and (len(self._sessions) > self.max_entries or self._bytes > self.max_bytes):
+            self._drop(next(iter(self._sessions)))
+
+    def get(self, context_id: str | None) -> dict | None:
+        if not context_id:
+            return None
+        with self._lock:
+            return self._get(context_id, time.time())
+
+    def _get(self, context_id: str, now: float) -> dict | None:
+        # Caller holds self._lock.
+        session = self._sessions.get(context_id)
+        if session is not None:
+            if not self._expired(session, now):
+                self._sessions.move_to_end(context_id)
+                return session
+            self._drop(context_id)
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT data, updated_at FROM sessions WHERE context_id = ?", (context_id,)
+        ).fetchone()
+        if row is None or now - row[1] > self.ttl_seconds:
+            return None
+        session = json.loads(row[0])
+        self._store(context_id, session, now, persist=False)
+        return session
+
+    def _store(self, context_id: str, session: dict, now: float, persist: bool = True) -> None:
+        if self.local_cache:
+            size = _approx_size(session)
+            self._drop(context_id)
+            if size > self.max_bytes:
+                # Inserting it would only make _evict empty the rest of the cache first.
+                logger.warning(
+                    "Session %s is ~%d bytes, over the %d byte cache cap; not kept in memory%s",
+                    context_id, size, self.max_bytes, "" if self._db is not None else " and lost (no SQLite)",
+                )
+            else:
+                self._sessions[context_id] = session
+                self._sizes[context_id] = size
+                self._bytes += size
+                self._evict(now)
+        if persist and self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (context_id, data, updated_at) VALUES (?, ?, ?)",
+                (context_id, json.dumps(session, default=str), session["updated_at"]),
+            )
+
+    def put(self, context_id: str, session: dict) -> None:
+        now = time.time()
+        session["updated_at"] = now
+        with self._lock:
+            self._store(context_id, session, now)
+
+    def _update(self, context_id: str, change) -> dict:
+        # Read, change and store under one lock hold, so concurrent turns do not overwrite each other.
+        now = time.time()
+        with self._lock:
+            session = self._get(context_id, now) or {"context": {}, "turns": [], "tool_results": {}}
+            change(session)
+            session["updated_at"] = now
+            self._store(context_id, session, now)
+            return session
+
+    def record_turn(self, context_id: str, question: str, response: str, context: dict) -> dict:
+        """Append a turn (keeping the last MAX_TURNS) and save the resolved context."""
+
+        def change(session: dict) -> None:
+            session["context"] = context
+            session["turns"] = (session.get("turns", []) + [{"question": question, "response": response}])[-MAX_TURNS:]
+
+        return self._update(context_id, change)
+
+    def cache_tool_result(self, context_id: str, key: str, value) -> None:
+        def change(session: dict) -> None:
+            session.setdefault("tool_results", {})[key] = {"value": value, "cached_at": time.time()}
+
+        self._update(context_id, change)
+
+    def cached_tool_result(self, context_id: str | None, key: str, max_age_seconds: float | None = None):
+        """A tool output cached earlier in this conversation, or None if absent or older than max_age_seconds."""
+        session = self.get(context_id)
+        if session is None:
+            return None
+        entry = session.get("tool_results", {}).get(key)
+        if entry is None:
+            return None
+        if max_age_seconds is not None and time.time() - entry.get("cached_at", 0.0) > max_age_seconds:
+            return None
+        return entry.get("value")
+
+    def prune(self) -> int:
+        """
+        Drop expired sessions from memory and SQLite, and cap SQLite at max_entries
+        (most recently updated kept); returns rows removed from SQLite.
+        """
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            if self._db is None:
+                return 0
+            expired = self._db.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl_seconds,))
+            overflow = self._db.execute(
+                "DELETE FROM sessions WHERE context_id NOT IN "
+                "(SELECT context_id FROM sessions ORDER BY updated_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            return expired.rowcount + overflow.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._sessions), "approx_bytes": self._bytes, "sqlite": self._db is not None}
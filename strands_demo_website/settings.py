@@ -0,0 +1,61 @@
+"""
+Agent connection settings, read from the environment (and .env) once per process.
+
+`load_settings()` is cached, so request handlers get the same frozen object
+without re-reading .env. The backend calls it at startup, so a missing
+SPIKETRACE_A2A_BASE or ELASTICSEARCH_API_KEY stops the process before it
+accepts traffic instead of failing each chat request.
+"""
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+DEFAULT_AGENT_ID = "spiketrace"
+DEFAULT_TIMEOUT_SECONDS = 60.0
+DEFAULT_DEADLINE_SECONDS = 120.0
+
+
+def _float_env(name: str, default: float) -> float:
+    value = os.getenv(name, str(default))
+    try:
+        return float(value)
+    except ValueError:
+        raise RuntimeError(f"{name} must be a number, got {value!r}")
+
+
+@dataclass(frozen=True)
+class AgentSettings:
+    a2a_base: str
+    api_key: str
+    agent_id: str = DEFAULT_AGENT_ID
+    timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS
+    # Upper bound for a whole /api/chat call; clients may ask for less via X-Deadline-Ms.
+    deadline_seconds: float = DEFAULT_DEADLINE_SECONDS
+
+    @classmethod
+    def from_env(cls) -> "AgentSettings":
+        missing = [name for name in ("SPIKETRACE_A2A_BASE", "ELASTICSEARCH_API_KEY") if not os.getenv(name)]
+        if missing:
+            raise RuntimeError(
+                f"{' and '.join(missing)} must be set (e.g. SPIKETRACE_A2A_BASE="
+                '"https://<your-kibana>/api/agent_builder/a2a")'
+            )
+        return cls(
+            a2a_base=os.environ["SPIKETRACE_A2A_BASE"].rstrip("/"),
+            api_key=os.environ["ELASTICSEARCH_API_KEY"],
+            agent_id=os.getenv("SPIKETRACE_AGENT_ID", DEFAULT_AGENT_ID),
+            timeout_seconds=_float_env("SPIKETRACE_A2A_TIMEOUT_SECONDS", DEFAULT_TIMEOUT_SECONDS),
+            deadline_seconds=_float_env("SPIKETRACE_CHAT_DEADLINE_SECONDS", DEFAULT_DEADLINE_SECONDS),
+        )
+
+    @property
+    def auth_headers(self) -> dict:
+        return {"Authorization": f"ApiKey {self.api_key}"}
+
+
+@lru_cache(maxsize=1)
+def load_settings() -> AgentSettings:
+    load_dotenv()
+    return AgentSettings.from_env()
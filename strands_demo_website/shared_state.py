@@ -0,0 +1,250 @@
+"""
+Cross-worker shared state for the chat backend: TTL key/value cache and counters.
+
+With several uvicorn/gunicorn workers, anything kept in a module-level dict is
+per-process (caches fragment, rate limits multiply by the worker count). This
+module gives every worker the same view through one of three backends, picked
+from the environment by SharedState.from_env():
+
+  - Redis (or any Redis-compatible server) when SPIKETRACE_REDIS_URL is set
+    and the optional `redis` package is installed
+  - a memory-mapped SQLite file (SPIKETRACE_SHARED_STATE_PATH) shared by all
+    workers on the host - the default under serve.py
+  - an in-process dict for single-worker development
+
+Backend calls block (SQLite may wait up to 5 s for the write lock), so async
+code should run them through asyncio.to_thread.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class MemoryBackend:
+    """Single-process backend; only correct with one worker."""
+
+    def __init__(self):
+        self._data: dict[str, tuple[str, float | None]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and time.time() >= expires_at:
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: str, ttl_seconds: float | None = None) -> None:
+        expires_at = time.time() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str, ttl_seconds: float | None = None) -> int:
+        with self._lock:
+            item = self._data.get(key)
+            now = time.time()
+            if item is None or (item[1] is not None and now >= item[1]):
+                self._data[key] = ("1", now + ttl_seconds if ttl_seconds else None)
+                return 1
+            count = int(item[0]) + 1
+            self._data[key] = (str(count), item[1] if ttl_seconds else None)
+            return count
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, expires_at) in self._data.items() if expires_at is not None and now >= expires_at]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
+
+
+class SQLiteBackend:
+    """
+    Host-local backend shared by every worker through one SQLite file.
+
+    WAL mode lets readers proceed while a writer commits, and mmap_size maps the
+    database into each worker's address space so hot reads avoid syscalls.
+    """
+
+    def __init__(self, path: str, mmap_bytes: int = 64 * 1024 * 1024):
+        self._local = threading.local()
+        self.path = path
+        self.mmap_bytes = mmap_bytes
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections are not thread-safe.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> str | None:
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl_seconds: float | None = None) -> None:
+        expires_at = time.time() + ttl_seconds if ttl_seconds else None
+        self._conn().execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, expires_at),
+        )
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def incr(self, key: str, ttl_seconds: float | None = None) -> int:
+        now = time.time()
+        conn = self._conn()
+        # BEGIN IMMEDIATE takes the write lock up front so concurrent workers serialize.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value, expires_at FROM kv WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                count, expires_at = 1, now + ttl_seconds if ttl_seconds else None
+            else:
+                count, expires_at = int(row[0]) + 1, row[1] if ttl_seconds else None
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, str(count), expires_at),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return count
+
+    def purge_expired(self) -> int:
+        cur = self._conn().execute(
+            "DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+        return cur.rowcount
+
+
+class RedisBackend:
+    """Redis / Redis-compatible backend (requires the optional `redis` package)."""
+
+    def __init__(self, url: str):
+        import redis
+
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, key: str) -> str | None:
+        return self._redis.get(key)
+
+    def set(self, key: str, value: str, ttl_seconds: float | None = None) -> None:
+        if ttl_seconds:
+            self._redis.set(key, value, px=int(ttl_seconds * 1000))
+        else:
+            self._redis.set(key, value)
+
+    def delete(self, key: str) -> None:
+        self._redis.delete(key)
+
+    def incr(self, key: str, ttl_seconds: float | None = None) -> int:
+        pipe = self._redis.pipeline()
+        pipe.incr(key)
+        if ttl_seconds:
+            pipe.pexpire(key, int(ttl_seconds * 1000), nx=True)
+        else:
+            pipe.persist(key)
+        count, _ = pipe.execute()
+        return int(count)
+
+    def purge_expired(self) -> int:
+        # Redis expires keys itself.
+        return 0
+
+
+class SharedState:
+    """JSON-valued facade over a backend, namespaced by key prefix."""
+
+    def __init__(self, backend, prefix: str = "spiketrace:"):
+        self.backend = backend
+        self.prefix = prefix
+
+    @classmethod
+    def from_env(cls) -> "SharedState":
+        redis_url = os.getenv("SPIKETRACE_REDIS_URL")
+        if redis_url:
+            return cls(RedisBackend(redis_url))
+        path = os.getenv("SPIKETRACE_SHARED_STATE_PATH")
+        if path:
+            return cls(SQLiteBackend(path))
+        return cls(MemoryBackend())
+
+    def get(self, key: str):
+        raw = self.backend.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value, ttl_seconds: float | None = None) -> None:
+        self.backend.set(self.prefix + key, json.dumps(value, default=str), ttl_seconds)
+
+    def delete(self, key: str) -> None:
+        self.backend.delete(self.prefix + key)
+
+    def incr(self, key: str, ttl_seconds: float | None = None) -> int:
+        """
+        Add 1 and return the new value. ttl_seconds is set when the key is created;
+        None means no expiry, and also clears one left on an existing key.
+        """
+        return self.backend.incr(self.prefix + key, ttl_seconds)
+
+    def purge_expired(self) -> int:
+        """Delete expired keys (e.g. old rate-limit windows); returns how many were removed."""
+        return self.backend.purge_expired()
+
+
+class RateLimiter:
+    """Fixed-window request limiter whose counters live in SharedState."""
+
+    def __init__(self, state: SharedState, limit: int, window_seconds: float = 60.0):
+        self.state = state
+        self.limit = limit
+        self.window_seconds = window_seconds
+
+    def allow(self, client_key: str) -> bool:
+        if self.limit <= 0:
+            return True
+        window = int(time.time() // self.window_seconds)
+        count = self.state.incr(f"rl:{client_key}:{window}", self.window_seconds)
+        return count <= self.limit
+
+
+class Counters:
+    """Named monotonically increasing counters in SharedState, summed across workers; the keys never expire."""
+
+    def __init__(self, state: SharedState, namespace: str, names: tuple[str, ...]):
+        self.state = state
+        self.namespace = namespace
+        self.names = names
+
+    def incr(self, name: str) -> int:
+        return self.state.incr(f"metrics:{self.namespace}:{name}")
+
+    def snapshot(self) -> dict:
+        return {name: int(self.state.get(f"metrics:{self.namespace}:{name}") or 0) for name in self.names}
@@ -0,0 +1,64 @@
+"""
+StaticFiles variant for the built frontend (see scripts/build_frontend.py).
+
+- Fingerprinted assets (name.<8 hex>.ext) are sent with a one-year immutable
+  Cache-Control, so repeat visits do not even revalidate them.
+- Everything else (HTML entry points) is sent with no-cache, so browsers
+  revalidate via the ETag that StaticFiles already emits and get a 304.
+- When the client accepts br/gzip and a pre-compressed sibling (.br/.gz)
+  exists, that file is served directly with Content-Encoding set.
+"""
+import mimetypes
+import os
+import re
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+FINGERPRINT_RE = re.compile(r"\.[0-9a-f]{8}\.[A-Za-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Preference order when the client accepts several encodings.
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code not in (200, 304):
+            return response
+
+        if isinstance(response, FileResponse) and response.status_code == 200:
+            compressed = self._compressed_variant(response.path, Headers(scope=scope))
+            if compressed is not None:
+                response = compressed
+
+        cache_control = IMMUTABLE_CACHE_CONTROL if FINGERPRINT_RE.search(path) else REVALIDATE_CACHE_CONTROL
+        response.headers["Cache-Control"] = cache_control
+        return response
+
+    def _compressed_variant(self, full_path: str, request_headers: Headers) -> Response | None:
+        accepted = {e.split(";")[0].strip() for e in request_headers.get("accept-encoding", "").split(",")}
+        for encoding, suffix in _ENCODINGS:
+            if encoding not in accepted:
+                continue
+            candidate = full_path + suffix
+            try:
+                stat_result = os.stat(candidate)
+            except OSError:
+                continue
+            media_type, _ = mimetypes.guess_type(full_path)
+            response = FileResponse(
+                candidate,
+                stat_result=stat_result,
+                media_type=media_type or "application/octet-stream",
+                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+            )
+            # Each encoding has its own ETag, so conditional requests still 304 correctly.
+            if self.is_not_modified(response.headers, request_headers):
+                return Response(status_code=304, headers={"ETag": response.headers["etag"], "Vary": "Accept-Encoding"})
+            return response
+        return None
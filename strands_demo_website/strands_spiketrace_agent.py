@@ -10,19 +10,32 @@ This will:
   - Stream and print the agent's response text
 """
 
+from __future__ import annotations
+
 import asyncio
-import os
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable
 from uuid import uuid4
 
-import httpx
-from a2a.client import A2ACardResolver, ClientConfig, ClientFactory
-from a2a.types import Message, Part, Role, Task, TextPart
-from dotenv import load_dotenv
+from settings import load_settings
+
+# httpx and the a2a client (with its pydantic models) are the slowest imports in
+# the backend; they are loaded on first use (or by warm_up()) instead of at import.
+if TYPE_CHECKING:
+    from a2a.types import Message, Role
+
+
+def warm_up() -> None:
+    """Import the A2A client stack ahead of the first chat request."""
+    import a2a.client  # noqa: F401
+    import a2a.types  # noqa: F401
+    import httpx  # noqa: F401
 
-DEFAULT_TIMEOUT = 60  # seconds
 
+def create_message(*, role: Role | None = None, text: str, context_id=None) -> Message:
+    from a2a.types import Message, Part, Role, TextPart
 
-def create_message(*, role: Role = Role.user, text: str, context_id=None) -> Message:
+    role = role or Role.user
     return Message(
         kind="message",
         role=role.value,
@@ -34,6 +47,8 @@ def create_message(*, role: Role = Role.user, text: str, context_id=None) -> Mes
 
 def _text_from_message(msg: Message) -> str:
     """Extract plain text from a Message's parts."""
+    from a2a.types import TextPart
+
     parts = []
     for part in msg.parts:
         if isinstance(part.root, TextPart):
@@ -41,31 +56,48 @@ def _text_from_message(msg: Message) -> str:
     return "".join(parts)
 
 
-async def query_spiketrace_agent(question: str, context_id: str | None = None) -> tuple[str, str | None]:
+async def _cancel_upstream(client, task_id: str) -> bool:
+    """Ask the agent to stop a task whose caller went away; best effort, bounded."""
+    from a2a.types import TaskIdParams
+
+    try:
+        await asyncio.wait_for(client.cancel_task(TaskIdParams(id=task_id)), timeout=5)
+        return True
+    except Exception:
+        return False
+
+
+async def query_spiketrace_agent(
+    question: str,
+    context_id: str | None = None,
+    deadline: float | None = None,
+    on_upstream_cancel: Callable[[bool], Awaitable[None]] | None = None,
+) -> tuple[str, str | None]:
     """
     Send a question to the SpikeTrace A2A agent and return (response_text, context_id).
     Pass context_id from a previous response to continue the same conversation so the
     agent can use tools (e.g. create_incident_ticket) when you say "yes".
-    Uses env: SPIKETRACE_A2A_BASE, ELASTICSEARCH_API_KEY, SPIKETRACE_AGENT_ID.
-    """
-    load_dotenv()
-    a2a_base = os.getenv("SPIKETRACE_A2A_BASE")
-    api_key = os.getenv("ELASTICSEARCH_API_KEY")
-    agent_id = os.getenv("SPIKETRACE_AGENT_ID", "spiketrace")
+    Uses settings.load_settings() (SPIKETRACE_A2A_BASE, ELASTICSEARCH_API_KEY, SPIKETRACE_AGENT_ID).
 
-    if not a2a_base:
-        return "Error: SPIKETRACE_A2A_BASE is not set. Set it to your Kibana A2A base URL.", None
-    if not api_key:
-        return "Error: ELASTICSEARCH_API_KEY is not set.", None
+    `deadline` (time.monotonic() based) caps every HTTP call at the remaining budget.
+    If this coroutine is cancelled mid-stream, the upstream A2A task is cancelled too
+    and `on_upstream_cancel(succeeded)` is awaited.
+    """
+    import httpx
+    from a2a.client import A2ACardResolver, ClientConfig, ClientFactory
+    from a2a.types import Message, Role, Task
 
-    custom_headers = {"Authorization": f"ApiKey {api_key}"}
+    settings = load_settings()
+    timeout = settings.timeout_seconds
+    if deadline is not None:
+        timeout = max(0.1, min(timeout, deadline - time.monotonic()))
 
     async with httpx.AsyncClient(
-        timeout=DEFAULT_TIMEOUT, headers=custom_headers
+        timeout=timeout, headers=settings.auth_headers
     ) as httpx_client:
-        resolver = A2ACardResolver(httpx_client=httpx_client, base_url=a2a_base.rstrip("/"))
+        resolver = A2ACardResolver(httpx_client=httpx_client, base_url=settings.a2a_base)
         agent_card = await resolver.get_agent_card(
-            relative_card_path=f"/{agent_id}.json"
+            relative_card_path=f"/{settings.agent_id}.json"
         )
         config = ClientConfig(
             httpx_client=httpx_client,
@@ -77,15 +109,25 @@ async def query_spiketrace_agent(question: str, context_id: str | None = None) -
         full_response = []
         out_context_id: str | None = context_id
         last_task: Task | None = None
-        async for event in client.send_message(msg):
-            if isinstance(event, Message):
-                out_context_id = getattr(event, "context_id", None) or out_context_id
-                full_response.append(_text_from_message(event))
-            elif isinstance(event, tuple) and len(event) >= 1:
-                task = event[0]
-                if isinstance(task, Task):
-                    last_task = task
-                    out_context_id = task.context_id
+        upstream_task_id: str | None = None
+        try:
+            async for event in client.send_message(msg):
+                if isinstance(event, Message):
+                    out_context_id = getattr(event, "context_id", None) or out_context_id
+                    upstream_task_id = getattr(event, "task_id", None) or upstream_task_id
+                    full_response.append(_text_from_message(event))
+                elif isinstance(event, tuple) and len(event) >= 1:
+                    task = event[0]
+                    if isinstance(task, Task):
+                        last_task = task
+                        upstream_task_id = task.id
+                        out_context_id = task.context_id
+        except asyncio.CancelledError:
+            if upstream_task_id:
+                cancelled = await _cancel_upstream(client, upstream_task_id)
+                if on_upstream_cancel:
+                    await on_upstream_cancel(cancelled)
+            raise
         if full_response:
             text = "".join(full_response)
         elif last_task and last_task.history:
@@ -101,23 +143,16 @@ async def query_spiketrace_agent(question: str, context_id: str | None = None) -
 
 
 async def main() -> None:
-    load_dotenv()
-
-    a2a_base = os.getenv("SPIKETRACE_A2A_BASE")
-    api_key = os.getenv("ELASTICSEARCH_API_KEY")
-    agent_id = os.getenv("SPIKETRACE_AGENT_ID", "spiketrace")
-
-    if not a2a_base:
-        raise SystemExit(
-            "SPIKETRACE_A2A_BASE is not set.\n"
-            "Example:\n"
-            "  export SPIKETRACE_A2A_BASE="
-            "\"https://<your-kibana>/api/agent_builder/a2a\""
-        )
-    if not api_key:
-        raise SystemExit("ELASTICSEARCH_API_KEY is not set.")
+    try:
+        settings = load_settings()
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+
+    import httpx
+    from a2a.client import A2ACardResolver, ClientConfig, ClientFactory
+    from a2a.types import Message, Role, TextPart
 
-    custom_headers = {"Authorization": f"ApiKey {api_key}"}
+    agent_id = settings.agent_id
 
     # Question from CLI args, or a default
     import sys
@@ -128,10 +163,10 @@ async def main() -> None:
         question = "Why did emissions spike in us-central1 yesterday?"
 
     async with httpx.AsyncClient(
-        timeout=DEFAULT_TIMEOUT, headers=custom_headers
+        timeout=settings.timeout_seconds, headers=settings.auth_headers
     ) as httpx_client:
         # 1) Get agent card
-        resolver = A2ACardResolver(httpx_client=httpx_client, base_url=a2a_base.rstrip("/"))
+        resolver = A2ACardResolver(httpx_client=httpx_client, base_url=settings.a2a_base)
         agent_card = await resolver.get_agent_card(
             relative_card_path=f"/{agent_id}.json"
         )